@@ -287,7 +287,6 @@ def process_all_pdfs(source_dir, output_dir):
         
         # Look for KRDS files
         pds_files = list(sdr_dir.glob("*.pds"))
-        pdt_files = list(sdr_dir.glob("*.pdt"))
         
         if not pds_files:
             print(f"  ⏭️  No .pds files found, skipping")
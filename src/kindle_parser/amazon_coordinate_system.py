@@ -1,8 +1,10 @@
 """Amazon coordinate conversion utilities and KRDS annotation extraction."""
 
 import fitz  # PyMuPDF
+import re
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from dataclasses import dataclass
 
 
@@ -37,6 +39,11 @@ class CoordinateSystemConfig:
 # Global configuration instance
 CONFIG = CoordinateSystemConfig()
 
+# Text patterns used while matching annotation content against page text
+_TOKEN_RE = re.compile(r"[\w']+|[^\w\s]")
+_PERIOD_DIGIT_RE = re.compile(r'(\w)\.(\d)')
+_PERIOD_CAPITAL_RE = re.compile(r'\.([A-Z])')
+
 
 def compute_linear_transformation_from_data(kindle_coords: List[Tuple[float, float]],
                                           pdf_coords: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
@@ -140,9 +147,8 @@ def find_text_in_pdf_robust(pdf_path: str, target_text: str, target_page: int) -
 
 def tokenize_text_robust(text: str) -> List[str]:
     """Tokenize text into words, handling punctuation and special characters."""
-    import re
     # Split on whitespace and punctuation, but keep meaningful tokens
-    tokens = re.findall(r"[\w']+|[^\w\s]", text.lower())
+    tokens = _TOKEN_RE.findall(text.lower())
     return [t for t in tokens if t.strip()]
 
 
@@ -463,29 +469,68 @@ def convert_kindle_to_pdf_coordinates(kindle_x: float, kindle_y: float, pdf_rect
     Returns:
         Tuple of (x, y) in PDF points
     """
-    # Inches-based formula: Convert from KRDS units (100 = 1 inch) to PDF points (72 = 1 inch)
-    pdf_x = (kindle_x / 100.0) * 72.0
-    pdf_y = (kindle_y / 100.0) * 72.0
-    
-    # Apply CropBox offset (CRITICAL for cropped PDFs)
-    # KRDS coordinates are absolute to original page, so we subtract the crop offset
-    if cropbox is not None:
-        cropbox_x0 = getattr(cropbox, 'x0', 0.0)
-        cropbox_y0 = getattr(cropbox, 'y0', 0.0)
-        pdf_x -= cropbox_x0
-        pdf_y -= cropbox_y0
-    
-    # Clamp within visible page bounds (CropBox dimensions)
-    # Always clamp to prevent out-of-bounds coordinates
+    return _convert_kindle_point(kindle_x, kindle_y, _conversion_frame(pdf_rect, cropbox))
+
+
+def convert_kindle_to_pdf_coordinates_bulk(
+    kindle_xs: Iterable[float],
+    kindle_ys: Iterable[float],
+    pdf_rect: Optional[Any] = None,
+    cropbox: Optional[Any] = None
+) -> Tuple[List[float], List[float]]:
+    """
+    Convert many KRDS points on the same page with convert_kindle_to_pdf_coordinates.
+
+    The page geometry is resolved once for the whole batch instead of once per point.
+
+    Args:
+        kindle_xs: KRDS X coordinates
+        kindle_ys: KRDS Y coordinates, paired with kindle_xs
+        pdf_rect: PDF page rectangle (for bounds checking)
+        cropbox: PDF CropBox (for offset correction on cropped PDFs)
+
+    Returns:
+        Tuple of (x list, y list) in PDF points
+    """
+    frame = _conversion_frame(pdf_rect, cropbox)
+    points = [_convert_kindle_point(kindle_x, kindle_y, frame) for kindle_x, kindle_y in zip(kindle_xs, kindle_ys)]
+    return [x for x, _ in points], [y for _, y in points]
+
+
+def _conversion_frame(pdf_rect: Optional[Any], cropbox: Optional[Any]) -> Tuple[float, float, Optional[float], Optional[float]]:
+    """
+    Return (x offset, y offset, width, height) for converting points onto a page.
+
+    The offset is the CropBox origin (KRDS coordinates are absolute to the original uncropped page,
+    so it is subtracted). Width and height bound the result: the CropBox dimensions when there is
+    a CropBox, otherwise those of pdf_rect, or None when there is nothing to clamp to.
+    """
     if cropbox is not None:
         # Use CropBox dimensions for bounds checking
-        page_width = float(getattr(cropbox, 'width', CONFIG.default_page_width))
-        page_height = float(getattr(cropbox, 'height', CONFIG.default_page_height))
-        pdf_x = max(0.0, min(pdf_x, page_width))
-        pdf_y = max(0.0, min(pdf_y, page_height))
-    elif pdf_rect is not None:
+        return (
+            getattr(cropbox, 'x0', 0.0),
+            getattr(cropbox, 'y0', 0.0),
+            float(getattr(cropbox, 'width', CONFIG.default_page_width)),
+            float(getattr(cropbox, 'height', CONFIG.default_page_height)),
+        )
+    if pdf_rect is not None:
         # Use rect dimensions for normal (uncropped) pages
         page_width, page_height = _resolve_page_dimensions(pdf_rect)
+        return 0.0, 0.0, page_width, page_height
+    return 0.0, 0.0, None, None
+
+
+def _convert_kindle_point(kindle_x: float, kindle_y: float,
+                          frame: Tuple[float, float, Optional[float], Optional[float]]) -> Tuple[float, float]:
+    """Convert one KRDS point using a frame from _conversion_frame."""
+    offset_x, offset_y, page_width, page_height = frame
+    # Inches-based formula: Convert from KRDS units (100 = 1 inch) to PDF points (72 = 1 inch),
+    # then apply the CropBox offset (CRITICAL for cropped PDFs)
+    pdf_x = (kindle_x / 100.0) * 72.0 - offset_x
+    pdf_y = (kindle_y / 100.0) * 72.0 - offset_y
+
+    # Clamp within visible page bounds to prevent out-of-bounds coordinates
+    if page_width is not None:
         pdf_x = max(0.0, min(pdf_x, page_width))
         pdf_y = max(0.0, min(pdf_y, page_height))
 
@@ -584,8 +629,10 @@ def _create_annotation_dict(
 ) -> Dict[str, Any]:
     """Create a standardized annotation dictionary with converted coordinates."""
 
-    # Convert using inches-based formula (validated) with CropBox correction
-    pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(kindle_x, kindle_y, pdf_rect, cropbox)
+    # Convert using inches-based formula (validated) with CropBox correction; the page geometry
+    # is resolved once for both the start and end points
+    frame = _conversion_frame(pdf_rect, cropbox)
+    pdf_x, pdf_y = _convert_kindle_point(kindle_x, kindle_y, frame)
     pdf_width = convert_kindle_width_to_pdf(width, pdf_rect, pdf_x)
     pdf_height = convert_kindle_height_to_pdf(height, pdf_rect, pdf_y)
     
@@ -594,7 +641,7 @@ def _create_annotation_dict(
     end_coords = _parse_position_coords(end_raw)
     if end_coords:
         kindle_x_end, kindle_y_end = end_coords
-        pdf_x_end, pdf_y_end = convert_kindle_to_pdf_coordinates(kindle_x_end, kindle_y_end, pdf_rect, cropbox)
+        pdf_x_end, pdf_y_end = _convert_kindle_point(kindle_x_end, kindle_y_end, frame)
 
     return {
         'type': annotation_type,
@@ -700,6 +747,15 @@ def _process_bookmark_annotation(bookmark: Any, pdf_rect: Any, cropbox: Optional
     )
 
 
+def _page_cropbox(pdf_doc: Optional[Any], page_index: int, cache: Dict[int, Any]) -> Optional[Any]:
+    """Return the CropBox of a PDF page (None without a PDF or for pages past its end), memoised in cache."""
+    if not pdf_doc or page_index >= len(pdf_doc):
+        return None
+    if page_index not in cache:
+        cache[page_index] = pdf_doc[page_index].cropbox
+    return cache[page_index]
+
+
 def _find_pdf_path(clippings_file: Optional[str], krds_file_path: str, book_name: str) -> Optional[str]:
     """Find the PDF file path based on clippings file, KRDS file, or book name."""
     
@@ -777,103 +833,119 @@ def _deduplicate_annotations(annotations: List[Dict[str, Any]]) -> List[Dict[str
     STRICT_TOLERANCE = 0.1  # Points - for same-type deduplication
     NOTE_UNIFICATION_TOLERANCE = 5.0  # Points - for note/highlight position matching
     
+    # Nothing to deduplicate or unify
+    if len(annotations) < 2:
+        return list(annotations)
+    
     unique_annotations = []
     seen_keys = set()
-    # Track position-based annotations for note/highlight unification
-    position_annotations = []  # List of (ann, page, x, y) for proximity matching
+    # Bound once: these are called for nearly every annotation
+    keep_annotation = unique_annotations.append
+    mark_seen = seen_keys.add
+    # Track position-based annotations for note/highlight unification, bucketed by page so each
+    # annotation is only compared with the notes/highlights on its own page
+    # page -> list of (ann, type, x, y, x_end, y_end) for proximity matching; the fields are
+    # copied out of the dict once so the inner comparison loop works on plain values
+    position_annotations_by_page = {}
 
     for ann in annotations:
+        ann_type = ann['type']
+        page = ann['pdf_page_0based']
+        x = ann['pdf_x']
+        y = ann['pdf_y']
+
         # Create full dedup key including type
-        content_key = ann.get('content', '').strip()[:50]
-        timestamp_key = ann.get('timestamp', '') if ann['type'] == 'bookmark' else ''
         full_dedup_key = (
-            ann['type'],
-            ann['pdf_page_0based'],
-            round(ann['pdf_x'], 1),
-            round(ann['pdf_y'], 1),
-            content_key,
-            timestamp_key,
+            ann_type,
+            page,
+            round(x, 1),
+            round(y, 1),
+            ann.get('content', '').strip()[:50],
+            ann.get('timestamp', '') if ann_type == 'bookmark' else '',
         )
 
         # Check if we've seen this exact annotation before (including type)
         if full_dedup_key in seen_keys:
-            print(f"   Skipped duplicate: {ann['type']} on page {ann['pdf_page_0based']} - {ann.get('content', '')[:30]}...")
+            print(f"   Skipped duplicate: {ann_type} on page {page} - {ann.get('content', '')[:30]}...")
             continue
         
         # Special handling for notes and highlights at the same position
-        if ann['type'] in ('note', 'highlight'):
+        if ann_type in ('note', 'highlight'):
+            page_positions = position_annotations_by_page.setdefault(page, [])
+            x_end = ann.get('pdf_x_end')
+            y_end = ann.get('pdf_y_end')
+            if x_end is None or y_end is None:
+                x_end = y_end = None
             # Look for existing annotation at same position (within tolerance)
             # For highlights, check both START and END positions since notes can be at either
             matching_ann = None
-            for existing_ann, ex_page, ex_x, ex_y in position_annotations:
-                if (existing_ann['type'] in ('note', 'highlight') and
-                    ex_page == ann['pdf_page_0based']):
-                    
-                    # Determine tolerance based on annotation types
-                    # Use strict tolerance for same-type comparisons (highlight-to-highlight)
-                    # Use loose tolerance for note/highlight unification
-                    if existing_ann['type'] == ann['type']:
-                        tolerance = STRICT_TOLERANCE  # 0.1pt for highlight-to-highlight deduplication
-                    else:
-                        tolerance = NOTE_UNIFICATION_TOLERANCE  # 5pt for note/highlight unification
-                    
-                    # Check if positions match (start-to-start, start-to-end, end-to-end, etc.)
-                    # Notes are typically placed at the END of highlights when user clicks to add note
-                    matches_start = (abs(ex_x - ann['pdf_x']) <= tolerance and
-                                   abs(ex_y - ann['pdf_y']) <= tolerance)
-                    
-                    # Also check if note position matches highlight END position
-                    matches_end = False
-                    if existing_ann.get('pdf_x_end') is not None and existing_ann.get('pdf_y_end') is not None:
-                        matches_end = (abs(existing_ann['pdf_x_end'] - ann['pdf_x']) <= tolerance and
-                                     abs(existing_ann['pdf_y_end'] - ann['pdf_y']) <= tolerance)
-                    
-                    # Check reverse: if current annotation is a highlight, check its end against note position
-                    if ann.get('pdf_x_end') is not None and ann.get('pdf_y_end') is not None:
-                        matches_end = matches_end or (abs(ann['pdf_x_end'] - ex_x) <= tolerance and
-                                                     abs(ann['pdf_y_end'] - ex_y) <= tolerance)
-                    
-                    if matches_start or matches_end:
-                        matching_ann = existing_ann
-                        break
+            for existing_ann, ex_type, ex_x, ex_y, ex_x_end, ex_y_end in page_positions:
+                # Determine tolerance based on annotation types
+                # Use strict tolerance for same-type comparisons (highlight-to-highlight)
+                # Use loose tolerance for note/highlight unification
+                if ex_type == ann_type:
+                    tolerance = STRICT_TOLERANCE  # 0.1pt for highlight-to-highlight deduplication
+                else:
+                    tolerance = NOTE_UNIFICATION_TOLERANCE  # 5pt for note/highlight unification
+                
+                # Check if positions match (start-to-start, start-to-end, end-to-end, etc.)
+                # Notes are typically placed at the END of highlights when user clicks to add note
+                matches_start = (abs(ex_x - x) <= tolerance and
+                               abs(ex_y - y) <= tolerance)
+                
+                # Also check if note position matches highlight END position
+                matches_end = False
+                if ex_x_end is not None:
+                    matches_end = (abs(ex_x_end - x) <= tolerance and
+                                 abs(ex_y_end - y) <= tolerance)
+                
+                # Check reverse: if current annotation is a highlight, check its end against note position
+                if x_end is not None:
+                    matches_end = matches_end or (abs(x_end - ex_x) <= tolerance and
+                                                 abs(y_end - ex_y) <= tolerance)
+                
+                if matches_start or matches_end:
+                    matching_ann = existing_ann
+                    break
             
             if matching_ann:
                 # If both are the same type, skip duplicate
-                if matching_ann['type'] == ann['type']:
-                    seen_keys.add(full_dedup_key)
-                    print(f"   Skipped duplicate: {ann['type']} on page {ann['pdf_page_0based']} - {ann.get('content', '')[:30]}...")
+                if matching_ann['type'] == ann_type:
+                    mark_seen(full_dedup_key)
+                    print(f"   Skipped duplicate: {ann_type} on page {page} - {ann.get('content', '')[:30]}...")
                     continue
                 
                 # Unify note and highlight - keep note but preserve highlight's text content
-                if ann['type'] == 'note':
+                if ann_type == 'note':
                     # Replace existing highlight with this note, but keep highlight's content for text matching
-                    print(f"   Unified highlight+note on page {ann['pdf_page_0based']} at ({ann['pdf_x']:.1f}, {ann['pdf_y']:.1f})")
+                    print(f"   Unified highlight+note on page {page} at ({x:.1f}, {y:.1f})")
                     # Store highlight content in note for text-based matching
                     if matching_ann.get('content') and not ann.get('highlight_content'):
                         ann['highlight_content'] = matching_ann['content']
-                    # Remove the existing highlight from unique_annotations and position_annotations
-                    unique_annotations = [a for a in unique_annotations if a is not matching_ann]
-                    position_annotations = [(a, p, x, y) for a, p, x, y in position_annotations if a is not matching_ann]
-                    position_annotations.append((ann, ann['pdf_page_0based'], ann['pdf_x'], ann['pdf_y']))
-                    unique_annotations.append(ann)
-                    seen_keys.add(full_dedup_key)
+                    # Remove the existing highlight from unique_annotations (in place, keep_annotation is
+                    # bound to it) and from its page's positions
+                    unique_annotations[:] = [a for a in unique_annotations if a is not matching_ann]
+                    page_positions[:] = [entry for entry in page_positions if entry[0] is not matching_ann]
+                    page_positions.append((ann, ann_type, x, y, x_end, y_end))
+                    keep_annotation(ann)
+                    mark_seen(full_dedup_key)
                 else:
                     # Current is highlight, existing is note - skip this highlight but preserve content
-                    print(f"   Unified highlight+note on page {ann['pdf_page_0based']} at ({ann['pdf_x']:.1f}, {ann['pdf_y']:.1f}) - keeping note")
+                    print(f"   Unified highlight+note on page {page} at ({x:.1f}, {y:.1f}) - keeping note")
                     # Store highlight content in note for text-based matching
                     if ann.get('content') and not matching_ann.get('highlight_content'):
                         matching_ann['highlight_content'] = ann['content']
-                    seen_keys.add(full_dedup_key)
+                    mark_seen(full_dedup_key)
                     continue
             else:
                 # First annotation at this position
-                position_annotations.append((ann, ann['pdf_page_0based'], ann['pdf_x'], ann['pdf_y']))
-                unique_annotations.append(ann)
-                seen_keys.add(full_dedup_key)
+                page_positions.append((ann, ann_type, x, y, x_end, y_end))
+                keep_annotation(ann)
+                mark_seen(full_dedup_key)
         else:
             # Bookmarks and other types - normal deduplication
-            seen_keys.add(full_dedup_key)
-            unique_annotations.append(ann)
+            mark_seen(full_dedup_key)
+            keep_annotation(ann)
 
     return unique_annotations
 
@@ -996,7 +1068,6 @@ def _detect_page_offset(myclippings_entries, krds_highlights, pdf_doc):
         return 0
     
     # Use the most common offset
-    from collections import Counter
     offset_counts = Counter(offsets)
     most_common_offset = offset_counts.most_common(1)[0][0]
     
@@ -1208,14 +1279,13 @@ def create_amazon_compliant_annotations(
     # This ensures notes and highlights can be unified based on same coordinate system
     print("\n📍 STEP 1: Processing KRDS annotations (coordinate-based)...")
     coordinate_based_annotations = []
+    cropboxes = {}  # page index -> CropBox, so each page is loaded once however many annotations it has
     
     # Process highlights
     for highlight in highlights:
         try:
             # Get page-specific cropbox if PDF is available
-            cropbox = None
-            if pdf_doc and highlight.start_position.page < len(pdf_doc):
-                cropbox = pdf_doc[highlight.start_position.page].cropbox
+            cropbox = _page_cropbox(pdf_doc, highlight.start_position.page, cropboxes)
             
             annotation = _process_highlight_annotation(highlight, actual_pdf_rect, cropbox)
             # Add matched content from MyClippings if available
@@ -1231,9 +1301,7 @@ def create_amazon_compliant_annotations(
     for note in notes:
         try:
             # Get page-specific cropbox if PDF is available
-            cropbox = None
-            if pdf_doc and note.start_position.page < len(pdf_doc):
-                cropbox = pdf_doc[note.start_position.page].cropbox
+            cropbox = _page_cropbox(pdf_doc, note.start_position.page, cropboxes)
             
             annotation = _process_note_annotation(note, actual_pdf_rect, cropbox)
             coordinate_based_annotations.append(annotation)
@@ -1246,9 +1314,7 @@ def create_amazon_compliant_annotations(
     for bookmark in bookmarks:
         try:
             # Get page-specific cropbox if PDF is available
-            cropbox = None
-            if pdf_doc and bookmark.start_position.page < len(pdf_doc):
-                cropbox = pdf_doc[bookmark.start_position.page].cropbox
+            cropbox = _page_cropbox(pdf_doc, bookmark.start_position.page, cropboxes)
             
             # Bookmarks use same processing as notes but with type='bookmark'
             annotation = _process_note_annotation(bookmark, actual_pdf_rect, cropbox)
@@ -1272,7 +1338,9 @@ def create_amazon_compliant_annotations(
         
         if pdf_path:
             unmatched_clippings = []  # Track unmatched clippings for learning mode
-            doc = fitz.open(pdf_path)
+            # Reuse the document opened above for page dimensions instead of parsing the PDF
+            # again; it is closed once at the end of this function
+            doc = pdf_doc
             updated_count = 0
             
             for entry in myclippings_entries:
@@ -1290,11 +1358,10 @@ def create_amazon_compliant_annotations(
                     search_text = ' '.join(content.split())
                     
                     # Handle abbreviations: "ch.4" -> "ch. 4" (add space after period if missing)
-                    import re
-                    search_text = re.sub(r'(\w)\.(\d)', r'\1. \2', search_text)
+                    search_text = _PERIOD_DIGIT_RE.sub(r'\1. \2', search_text)
                     
                     # Handle periods without spaces: "word.Word" -> "word. Word"
-                    search_text = re.sub(r'\.([A-Z])', r'. \1', search_text)
+                    search_text = _PERIOD_CAPITAL_RE.sub(r'. \1', search_text)
                     
                     # Normalize both texts to handle ligatures and hyphenation
                     def strip_ligatures(text: str) -> str:
@@ -1311,7 +1378,7 @@ def create_amazon_compliant_annotations(
                         # Pattern: "-\xad\n" should become "-" (remove soft hyphen and newline, keep hyphen)
                         text = text.replace('-\u00ad\n', '-')  # hyphen + soft hyphen + newline → hyphen
                         text = text.replace('\u00ad', '')  # Remove remaining soft hyphens
-                        text = re.sub(r'-\n', '', text)  # Remove hyphens at line breaks (without soft hyphens)
+                        text = text.replace('-\n', '')  # Remove hyphens at line breaks (without soft hyphens)
                         text = ' '.join(text.split())  # Normalize whitespace
                         return text
                     
@@ -1369,7 +1436,7 @@ def create_amazon_compliant_annotations(
                             
                             # Normalize the extracted text for searching
                             # PyMuPDF can't search text with newlines/hyphens, so we need to normalize
-                            orig_text_for_search = re.sub(r'-\n', '', orig_text)  # Remove soft hyphens
+                            orig_text_for_search = orig_text.replace('-\n', '')  # Remove soft hyphens
                             orig_text_for_search = ' '.join(orig_text_for_search.split())  # Collapse whitespace
                             
                             # Search for the normalized original text
@@ -1744,8 +1811,6 @@ def create_amazon_compliant_annotations(
                                 'book_name': book_name
                             })
 
-            doc.close()
-
             if learn_mode and unmatched_clippings:
                 print(f"   📚 Learning mode: {len(unmatched_clippings)} unmatched clippings collected")
                 
@@ -24,6 +24,7 @@ def main():
     parser.add_argument("--clippings", help="Path to MyClippings.txt file (optional)")
     parser.add_argument("--export-json", help="Export annotations to JSON file")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument("--compact", action="store_true", help="Fully rewrite the output PDF for the smallest file size (slower)")
     parser.add_argument("--learn", action="store_true", help="Enable learning mode to export unmatched clippings with context")
     parser.add_argument("--learn-output", help="Output file for learning data (JSON format)")
     
@@ -190,7 +191,7 @@ def main():
     # Create annotated PDF
     print(f"Creating annotated PDF: {args.output}")
     try:
-        success = annotate_pdf_file(args.pdf_file, pdf_annotations, args.output)
+        success = annotate_pdf_file(args.pdf_file, pdf_annotations, args.output, compact=args.compact)
         if success:
             print(f"✅ Success! Annotated PDF saved to: {args.output}")
             
@@ -5,6 +5,7 @@ Detects column boundaries and constrains highlights within columns.
 """
 
 import fitz
+from collections import defaultdict
 from typing import List, Dict, Tuple, Optional
 
 
@@ -66,7 +67,6 @@ class ColumnDetector:
         left_positions = [line['left'] for line in all_lines]
         
         # Group similar left positions (within tolerance)
-        from collections import defaultdict
         margin_groups = defaultdict(list)
         tolerance = 15  # Points
         
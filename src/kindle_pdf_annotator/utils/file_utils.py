@@ -2,12 +2,21 @@
 File Utilities - Common file handling functions
 """
 
+import fnmatch
 import os
 import shutil
+from stat import S_ISDIR, S_ISREG
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, BinaryIO, Callable, Tuple
 import logging
-import chardet
+
+# cchardet is a C extension that is only present when installed on purpose (the "speedups"
+# extra); everything else uses chardet. charset-normalizer is deliberately not picked up: it is
+# pure Python, often installed as a dependency of requests, and scores confidence differently
+try:
+    from cchardet import detect as _detect_encoding
+except ImportError:
+    from chardet import detect as _detect_encoding
 
 logger = logging.getLogger(__name__)
 
@@ -28,36 +37,66 @@ def find_kindle_files(kindle_folder: str, pdf_name: str) -> Dict[str, List[Path]
         logger.error(f"Kindle folder does not exist: {kindle_folder}")
         return {"pds": [], "pdt": [], "sdr": []}
     
+    return _match_kindle_files(kindle_path, _scan_kindle_folder(kindle_path), pdf_name)
+
+
+def find_kindle_files_batch(kindle_folder: str, pdf_names: List[str]) -> Dict[str, Dict[str, List[Path]]]:
+    """
+    Find Kindle annotation files for many PDFs with a single scan of the Kindle folder
+    
+    Args:
+        kindle_folder: Path to Kindle documents folder
+        pdf_names: Names of the PDF files (without extension)
+        
+    Returns:
+        Dictionary mapping each PDF name to its find_kindle_files result
+    """
+    kindle_path = Path(kindle_folder)
+    if not kindle_path.exists():
+        logger.error(f"Kindle folder does not exist: {kindle_folder}")
+        return {name: {"pds": [], "pdt": [], "sdr": []} for name in pdf_names}
+    
+    entries = _scan_kindle_folder(kindle_path)
+    return {name: _match_kindle_files(kindle_path, entries, name) for name in pdf_names}
+
+
+def _scan_kindle_folder(kindle_path: Path) -> List[Tuple[str, str]]:
+    """
+    List (name, type) for the folder's PDS/PDT files and SDR folders (Sidecar Data Records),
+    told apart by extension
+    """
+    try:
+        names = os.listdir(kindle_path)
+    except OSError:
+        return []
+    
+    entries = []
+    for name in names:
+        file_type = os.path.normcase(name).rpartition('.')[2]
+        if file_type in ("pds", "pdt", "sdr"):
+            entries.append((name, file_type))
+    return entries
+
+
+def _match_kindle_files(kindle_path: Path, entries: List[Tuple[str, str]], pdf_name: str) -> Dict[str, List[Path]]:
+    """Match scanned Kindle folder entries against the name variants of one PDF"""
     # Clean PDF name for searching
     clean_name = pdf_name.replace(' ', '_').replace('-', '_')
     
-    # Search patterns
-    patterns = [
+    # Search patterns (deduplicated, several variants usually coincide)
+    patterns = list(dict.fromkeys([
         f"*{pdf_name}*",
         f"*{clean_name}*",
         f"*{pdf_name.replace('_', ' ')}*",
         f"*{pdf_name.replace(' ', '_')}*"
-    ]
+    ]))
     
     found_files = {"pds": [], "pdt": [], "sdr": []}
     
-    # Search for each pattern
-    for pattern in patterns:
-        # Find PDS files
-        pds_files = list(kindle_path.glob(f"{pattern}.pds"))
-        found_files["pds"].extend(pds_files)
-        
-        # Find PDT files
-        pdt_files = list(kindle_path.glob(f"{pattern}.pdt"))
-        found_files["pdt"].extend(pdt_files)
-        
-        # Find SDR folders (Sidecar Data Records)
-        sdr_folders = list(kindle_path.glob(f"{pattern}.sdr"))
-        found_files["sdr"].extend(sdr_folders)
-    
-    # Remove duplicates
-    for file_type in found_files:
-        found_files[file_type] = list(set(found_files[file_type]))
+    # Each entry of the folder scan is visited once, so no dedup is needed
+    for name, file_type in entries:
+        if any(fnmatch.fnmatch(name, f"{pattern}.{file_type}") for pattern in patterns):
+            found_files[file_type].append(kindle_path / name)
     
     logger.info(f"Found {len(found_files['pds'])} PDS, {len(found_files['pdt'])} PDT, "
                 f"and {len(found_files['sdr'])} SDR files for '{pdf_name}'")
@@ -65,6 +104,13 @@ def find_kindle_files(kindle_folder: str, pdf_name: str) -> Dict[str, List[Path]
     return found_files
 
 
+# Byte values that may appear in pure ASCII text; deleting them leaves only non-ASCII bytes
+_ASCII_BYTES = bytes(range(128))
+
+# Bytes sampled for encoding detection (first 10KB)
+_ENCODING_SAMPLE_SIZE = 10000
+
+
 def detect_file_encoding(file_path: str) -> str:
     """
     Detect the encoding of a text file
@@ -77,27 +123,67 @@ def detect_file_encoding(file_path: str) -> str:
     """
     try:
         with open(file_path, 'rb') as f:
-            raw_data = f.read(10000)  # Read first 10KB
-            result = chardet.detect(raw_data)
-            encoding = result.get('encoding', 'utf-8')
-            confidence = result.get('confidence', 0)
-            
-            logger.debug(f"Detected encoding for {file_path}: {encoding} (confidence: {confidence:.2f})")
-            
-            # Fallback to common encodings if confidence is low
-            if confidence < 0.5:
-                return 'utf-8'
-            
-            return encoding
+            return _detect_open_file_encoding(f, str(file_path))
     except Exception as e:
         logger.warning(f"Error detecting encoding for {file_path}: {e}")
         return 'utf-8'
 
 
+# Detected encodings keyed by (path, mtime_ns, size), so unchanged files are not re-sniffed
+_encoding_cache: Dict[Tuple[str, int, int], str] = {}
+_ENCODING_CACHE_SIZE = 128
+
+
+def _detect_open_file_encoding(f: BinaryIO, file_path: str, raw_data: Optional[bytes] = None) -> str:
+    """Detect the encoding of an open binary file, reusing raw_data if the start was already read"""
+    stat = os.fstat(f.fileno())
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    encoding = _encoding_cache.get(key)
+    if encoding is None:
+        if raw_data is None:
+            raw_data = f.read(_ENCODING_SAMPLE_SIZE)
+        encoding = _detect_bytes_encoding(raw_data[:_ENCODING_SAMPLE_SIZE], file_path)
+        if len(_encoding_cache) >= _ENCODING_CACHE_SIZE:
+            _encoding_cache.clear()
+        _encoding_cache[key] = encoding
+    return encoding
+
+
+def _detect_bytes_encoding(raw_data: bytes, file_path: str) -> str:
+    """Detect the encoding of a sample of bytes read from file_path"""
+    # Pure ASCII needs no statistical detection (this is what chardet would report anyway)
+    if raw_data and not raw_data.translate(None, _ASCII_BYTES):
+        logger.debug(f"Detected encoding for {file_path}: ascii")
+        return 'ascii'
+    
+    result = _detect_encoding(raw_data)
+    encoding = result.get('encoding') or 'utf-8'
+    confidence = result.get('confidence') or 0
+    
+    logger.debug(f"Detected encoding for {file_path}: {encoding} (confidence: {confidence:.2f})")
+    
+    # Fallback to common encodings if confidence is low
+    if confidence < 0.5:
+        return 'utf-8'
+    
+    return encoding
+
+
+def _decode_text(raw_data: bytes, encoding: str, errors: str = 'strict') -> str:
+    """Decode bytes the way text-mode open() would, including universal newline translation"""
+    text = raw_data.decode(encoding, errors)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
 def safe_read_text_file(file_path: str, encoding: Optional[str] = None) -> str:
     """
     Safely read a text file with encoding detection
     
+    The file is opened and read once; detection and all decoding attempts work on
+    the same bytes.
+    
     Args:
         file_path: Path to the file
         encoding: Specific encoding to use (optional)
@@ -105,12 +191,17 @@ def safe_read_text_file(file_path: str, encoding: Optional[str] = None) -> str:
     Returns:
         File contents as string
     """
-    if not encoding:
-        encoding = detect_file_encoding(file_path)
+    with open(file_path, 'rb') as f:
+        raw_data = f.read()
+        if not encoding:
+            try:
+                encoding = _detect_open_file_encoding(f, str(file_path), raw_data)
+            except Exception as e:
+                logger.warning(f"Error detecting encoding for {file_path}: {e}")
+                encoding = 'utf-8'
     
     try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            return f.read()
+        return _decode_text(raw_data, encoding)
     except UnicodeDecodeError:
         # Try fallback encodings
         fallback_encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
@@ -118,16 +209,15 @@ def safe_read_text_file(file_path: str, encoding: Optional[str] = None) -> str:
         for fallback in fallback_encodings:
             if fallback != encoding:
                 try:
-                    with open(file_path, 'r', encoding=fallback) as f:
-                        logger.warning(f"Used fallback encoding {fallback} for {file_path}")
-                        return f.read()
+                    text = _decode_text(raw_data, fallback)
                 except UnicodeDecodeError:
                     continue
+                logger.warning(f"Used fallback encoding {fallback} for {file_path}")
+                return text
         
         # Last resort: ignore errors
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            logger.warning(f"Reading {file_path} with error handling")
-            return f.read()
+        logger.warning(f"Reading {file_path} with error handling")
+        return _decode_text(raw_data, 'utf-8', errors='ignore')
 
 
 def create_backup(file_path: str, backup_suffix: str = ".backup") -> Optional[str]:
@@ -142,15 +232,16 @@ def create_backup(file_path: str, backup_suffix: str = ".backup") -> Optional[st
         Path to backup file or None if failed
     """
     try:
-        original_path = Path(file_path)
-        if not original_path.exists():
+        if not os.path.exists(file_path):
             return None
         
-        backup_path = original_path.with_suffix(original_path.suffix + backup_suffix)
-        shutil.copy2(file_path, str(backup_path))
+        # Append the suffix to the full name; Path.with_suffix would reject suffixes
+        # without a leading dot for files that have no extension
+        backup_path = os.fspath(file_path) + backup_suffix
+        shutil.copy2(file_path, backup_path)
         
         logger.info(f"Created backup: {backup_path}")
-        return str(backup_path)
+        return backup_path
         
     except Exception as e:
         logger.error(f"Error creating backup for {file_path}: {e}")
@@ -187,25 +278,30 @@ def get_file_info(file_path: str) -> Dict[str, Any]:
     """
     path = Path(file_path)
     
-    if not path.exists():
-        return {"exists": False, "error": "File not found"}
-    
+    # A single stat answers existence, size, mtime and file type
     try:
-        stat = path.stat()
-        return {
-            "exists": True,
-            "name": path.name,
-            "stem": path.stem,
-            "suffix": path.suffix,
-            "size": stat.st_size,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "modified": stat.st_mtime,
-            "is_file": path.is_file(),
-            "is_dir": path.is_dir(),
-            "absolute_path": str(path.absolute())
-        }
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return {"exists": False, "error": "File not found"}
     except Exception as e:
         return {"exists": True, "error": str(e)}
+    
+    return {
+        "exists": True,
+        "name": path.name,
+        "stem": path.stem,
+        "suffix": path.suffix,
+        "size": stat.st_size,
+        "size_mb": round(stat.st_size / (1024 * 1024), 2),
+        "modified": stat.st_mtime,
+        "is_file": S_ISREG(stat.st_mode),
+        "is_dir": S_ISDIR(stat.st_mode),
+        "absolute_path": str(path.absolute())
+    }
+
+
+# Characters that are not allowed in file names on common file systems, mapped to '_'
+_INVALID_FILENAME_CHARS = str.maketrans(dict.fromkeys('<>:"/\\|?*', '_'))
 
 
 def clean_filename(filename: str) -> str:
@@ -218,15 +314,8 @@ def clean_filename(filename: str) -> str:
     Returns:
         Cleaned filename
     """
-    # Remove or replace invalid characters
-    invalid_chars = '<>:"/\\|?*'
-    cleaned = filename
-    
-    for char in invalid_chars:
-        cleaned = cleaned.replace(char, '_')
-    
-    # Remove leading/trailing spaces and dots
-    cleaned = cleaned.strip(' .')
+    # Replace invalid characters and remove leading/trailing spaces and dots
+    cleaned = filename.translate(_INVALID_FILENAME_CHARS).strip(' .')
     
     # Limit length
     if len(cleaned) > 200:
@@ -280,13 +369,17 @@ def list_pdf_files(directory: str) -> List[str]:
     """
     try:
         dir_path = Path(directory)
-        if not dir_path.exists():
+        if not dir_path.is_dir():
             return []
         
-        pdf_files = []
-        for file_path in dir_path.glob("*.pdf"):
-            if file_path.is_file():
-                pdf_files.append(str(file_path))
+        # One scandir pass on plain strings; the suffix check is case-insensitive so that
+        # '.PDF' files are listed on case-sensitive filesystems too
+        prefix = str(dir_path) if str(dir_path) != '.' else ''
+        with os.scandir(dir_path) as entries:
+            pdf_files = [
+                os.path.join(prefix, entry.name) for entry in entries
+                if entry.name.lower().endswith('.pdf') and entry.is_file()
+            ]
         
         pdf_files.sort()  # Sort alphabetically
         return pdf_files
@@ -296,14 +389,16 @@ def list_pdf_files(directory: str) -> List[str]:
         return []
 
 
-def copy_file_with_progress(src: str, dst: str, chunk_size: int = 64 * 1024) -> bool:
+def copy_file_with_progress(src: str, dst: str, chunk_size: int = 64 * 1024,
+                            progress_callback: Optional[Callable[[int, int], None]] = None) -> bool:
     """
     Copy a file with progress tracking capability
     
     Args:
         src: Source file path
         dst: Destination file path
-        chunk_size: Size of chunks to copy at a time
+        chunk_size: Size of chunks to copy at a time (only used with a progress callback)
+        progress_callback: Optional callable receiving (bytes_copied, total_bytes)
         
     Returns:
         True if copy was successful
@@ -319,13 +414,21 @@ def copy_file_with_progress(src: str, dst: str, chunk_size: int = 64 * 1024) ->
         # Ensure destination directory exists
         dst_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Copy file in chunks
-        with open(src_path, 'rb') as src_file, open(dst_path, 'wb') as dst_file:
-            while True:
-                chunk = src_file.read(chunk_size)
-                if not chunk:
-                    break
-                dst_file.write(chunk)
+        if progress_callback is None:
+            # No progress to report: let the OS do the copy (sendfile / CopyFileEx)
+            shutil.copyfile(src_path, dst_path)
+        else:
+            # Copy file in chunks, reporting progress after each one
+            total = src_path.stat().st_size
+            copied = 0
+            with open(src_path, 'rb') as src_file, open(dst_path, 'wb') as dst_file:
+                while True:
+                    chunk = src_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst_file.write(chunk)
+                    copied += len(chunk)
+                    progress_callback(copied, total)
         
         logger.info(f"Successfully copied {src} to {dst}")
         return True
@@ -5,11 +5,59 @@ Kindle's location encoding system.
 """
 
 import re
-from typing import Optional, Dict, Any, Tuple
+from functools import lru_cache
+from typing import Optional, Dict, Any, Iterable, List, NamedTuple, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# First run of digits in a mixed location string (e.g. "Location 1500")
+_DIGITS_RE = re.compile(r'\d+')
+
+
+class DecodedLocation(NamedTuple):
+    """
+    Compact result of decoding a location string.
+
+    type is "range", "single", "extracted" or "error". location is the (start) location
+    number, end_location equals location unless type is "range", and error holds the
+    message when type is "error".
+    """
+    type: str
+    location: int = 0
+    end_location: int = 0
+    error: str = ""
+
+
+@lru_cache(maxsize=8192)
+def _parse_location(clean_location: str) -> DecodedLocation:
+    """
+    Parse a stripped location string into a DecodedLocation.
+
+    Cached because the same locations are decoded repeatedly by compare_locations,
+    normalize_location_format and PageLocationMapper.
+    """
+    # Handle range locations (e.g., "1234-1235")
+    if '-' in clean_location:
+        parts = clean_location.split('-')
+        if len(parts) == 2:
+            try:
+                return DecodedLocation("range", int(parts[0]), int(parts[1]))
+            except ValueError:
+                return DecodedLocation("error", error=f"Invalid range format: {clean_location}")
+
+    # Handle single location
+    try:
+        location_num = int(clean_location)
+        return DecodedLocation("single", location_num, location_num)
+    except ValueError:
+        # Try to extract number from mixed string
+        match = _DIGITS_RE.search(clean_location)
+        if match:
+            location_num = int(match.group())
+            return DecodedLocation("extracted", location_num, location_num)
+        return DecodedLocation("error", error=f"Cannot parse location: {clean_location}")
+
 
 class KindleLocationEncoder:
     """Handle Kindle location encoding and conversion"""
@@ -19,6 +67,23 @@ class KindleLocationEncoder:
         self.WORDS_PER_LOCATION = 150  # Approximate words per Kindle location
         self.LOCATIONS_PER_PAGE = 10   # Approximate locations per traditional page
         
+    def parse_location(self, location_str: str) -> DecodedLocation:
+        """
+        Decode a Kindle location string into a DecodedLocation tuple
+        
+        Lighter than decode_location (no per-call dictionary or estimates), for code
+        that only needs the location numbers.
+        
+        Args:
+            location_str: Location string (e.g., "1234-1235", "567")
+            
+        Returns:
+            DecodedLocation; its type is "error" if the string cannot be decoded
+        """
+        if not location_str:
+            return DecodedLocation("error", error="Empty location string")
+        return _parse_location(str(location_str).strip())
+    
     def decode_location(self, location_str: str) -> Dict[str, Any]:
         """
         Decode a Kindle location string into components
@@ -35,47 +100,37 @@ class KindleLocationEncoder:
         try:
             # Clean the location string
             clean_location = str(location_str).strip()
+            decoded = _parse_location(clean_location)
+            kind = decoded.type
             
-            # Handle range locations (e.g., "1234-1235")
-            if '-' in clean_location:
-                parts = clean_location.split('-')
-                if len(parts) == 2:
-                    try:
-                        start_loc = int(parts[0])
-                        end_loc = int(parts[1])
-                        return {
-                            "type": "range",
-                            "start_location": start_loc,
-                            "end_location": end_loc,
-                            "span": end_loc - start_loc + 1,
-                            "estimated_words": (end_loc - start_loc + 1) * self.WORDS_PER_LOCATION,
-                            "estimated_page": self._location_to_page(start_loc)
-                        }
-                    except ValueError:
-                        return {"error": f"Invalid range format: {clean_location}"}
-            
-            # Handle single location
-            try:
-                location_num = int(clean_location)
+            if kind == "range":
+                start_loc, end_loc = decoded.location, decoded.end_location
+                return {
+                    "type": "range",
+                    "start_location": start_loc,
+                    "end_location": end_loc,
+                    "span": end_loc - start_loc + 1,
+                    "estimated_words": (end_loc - start_loc + 1) * self.WORDS_PER_LOCATION,
+                    "estimated_page": self._location_to_page(start_loc)
+                }
+            if kind == "single":
+                location_num = decoded.location
                 return {
                     "type": "single",
                     "location": location_num,
                     "estimated_words": self.WORDS_PER_LOCATION,
                     "estimated_page": self._location_to_page(location_num)
                 }
-            except ValueError:
-                # Try to extract number from mixed string
-                match = re.search(r'\d+', clean_location)
-                if match:
-                    location_num = int(match.group())
-                    return {
-                        "type": "extracted",
-                        "location": location_num,
-                        "original": clean_location,
-                        "estimated_page": self._location_to_page(location_num)
-                    }
-                
-                return {"error": f"Cannot parse location: {clean_location}"}
+            if kind == "extracted":
+                location_num = decoded.location
+                return {
+                    "type": "extracted",
+                    "location": location_num,
+                    "original": clean_location,
+                    "estimated_page": self._location_to_page(location_num)
+                }
+            
+            return {"error": decoded.error}
                 
         except Exception as e:
             logger.warning(f"Error decoding location '{location_str}': {e}")
@@ -181,17 +236,14 @@ class KindleLocationEncoder:
         Returns:
             Normalized location string
         """
-        decoded = self.decode_location(location_str)
+        decoded = self.parse_location(location_str)
         
-        if "error" in decoded:
+        if decoded.type == "error":
             return str(location_str)  # Return original if cannot decode
         
-        if decoded["type"] == "range":
-            return f"{decoded['start_location']}-{decoded['end_location']}"
-        elif decoded["type"] in ["single", "extracted"]:
-            return str(decoded["location"])
-        
-        return str(location_str)
+        if decoded.type == "range":
+            return f"{decoded.location}-{decoded.end_location}"
+        return str(decoded.location)
 
 
 class PageLocationMapper:
@@ -201,6 +253,9 @@ class PageLocationMapper:
         self.pdf_page_count = pdf_page_count
         self.estimated_total_locations = estimated_total_locations or (pdf_page_count * 10)
         self.encoder = KindleLocationEncoder()
+        # Mapped (page, confidence) per location string, valid for the (page count, total) basis
+        self._page_memo: Dict[Any, Tuple[int, float]] = {}
+        self._memo_basis: Optional[Tuple[int, int]] = None
         
     def kindle_location_to_pdf_page(self, location: str) -> Tuple[int, float]:
         """
@@ -212,28 +267,60 @@ class PageLocationMapper:
         Returns:
             Tuple of (page_number, confidence_score)
         """
-        decoded = self.encoder.decode_location(location)
+        return self.kindle_locations_to_pdf_pages((location,))[0]
+    
+    def kindle_locations_to_pdf_pages(self, locations: Iterable[str]) -> List[Tuple[int, float]]:
+        """
+        Map many Kindle locations to PDF page numbers in one pass
         
-        if "error" in decoded:
-            return 0, 0.0  # Default to first page with low confidence
+        Reads the cached parse tuples directly instead of building a decoded
+        dictionary per location, and hoists the per-book constants out of the loop.
         
-        # Get location number
-        if decoded["type"] == "range":
-            loc_num = decoded["start_location"]
-        elif decoded["type"] in ["single", "extracted"]:
-            loc_num = decoded["location"]
-        else:
-            return 0, 0.0
+        Args:
+            locations: Kindle location strings
+            
+        Returns:
+            List of (page_number, confidence_score) tuples, in input order
+        """
+        total_locations = self.estimated_total_locations
+        page_count = self.pdf_page_count
+        last_page = page_count - 1
+        # Confidence based on how well we can estimate
+        confidence = 0.7 if total_locations else 0.3
         
-        # Calculate PDF page (0-based)
-        percentage = loc_num / self.estimated_total_locations
-        pdf_page = int(percentage * self.pdf_page_count)
-        pdf_page = max(0, min(pdf_page, self.pdf_page_count - 1))
+        # Books repeat the same locations (notes and highlights share them), so results are
+        # memoised per location; the memo is dropped if the page count or total is changed
+        basis = (page_count, total_locations)
+        if self._memo_basis != basis:
+            self._page_memo = {}
+            self._memo_basis = basis
+        memo = self._page_memo
         
-        # Confidence based on how well we can estimate
-        confidence = 0.7 if self.estimated_total_locations else 0.3
+        results = []
+        for location in locations:
+            if not location:
+                results.append((0, 0.0))  # Default to first page with low confidence
+                continue
+            
+            result = memo.get(location)
+            if result is None:
+                decoded = _parse_location(str(location).strip())
+                if decoded.type == "error":
+                    result = (0, 0.0)
+                else:
+                    # Range start, single or extracted location number
+                    loc_num = decoded.location
+                    
+                    # Calculate PDF page (0-based)
+                    percentage = loc_num / total_locations
+                    pdf_page = int(percentage * page_count)
+                    pdf_page = max(0, min(pdf_page, last_page))
+                    result = (pdf_page, confidence)
+                memo[location] = result
+            
+            results.append(result)
         
-        return pdf_page, confidence
+        return results
     
     def pdf_page_to_kindle_location(self, page_number: int) -> Tuple[int, float]:
         """
@@ -5,11 +5,15 @@ This module uses PyMuPDF (fitz) to embed Kindle annotations into PDF files.
 
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, BinaryIO, Optional, Tuple, Union
+import datetime
 import logging
 import re
 import os
-from collections import defaultdict
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from types import SimpleNamespace
 
 # Import column-aware highlighting
 try:
@@ -17,8 +21,129 @@ try:
 except ImportError:
     from column_aware_highlighting import ColumnDetector
 
+try:
+    from ..kindle_parser.amazon_coordinate_system import convert_kindle_to_pdf_coordinates
+except ImportError:
+    try:
+        from kindle_parser.amazon_coordinate_system import convert_kindle_to_pdf_coordinates
+    except ImportError:
+        # Without the converter Kindle position strings are not used; the other quad sources still are
+        convert_kindle_to_pdf_coordinates = None
+
 logger = logging.getLogger(__name__)
 
+# Standard page rect used to convert Kindle position strings when the real page rect is unknown
+_STANDARD_PDF_RECT = SimpleNamespace(width=595.3, height=841.9)
+
+# Stroke colour of every Kindle highlight (yellow). All highlights share one style, so there is
+# no type/colour grouping to batch on; each Kindle highlight stays its own PDF annotation.
+_HIGHLIGHT_COLOR = (1, 1, 0)
+
+# rawdict extraction without image blocks: only char positions are needed, and the default
+# flags would decode and copy every embedded image on the page
+_RAWDICT_TEXT_FLAGS = fitz.TEXTFLAGS_RAWDICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Deletes hyphens so hyphenated words are stitched together before matching
+_HYPHEN_DELETE = str.maketrans("", "", "-")
+# Runs of anything other than lower-case ASCII letters and digits
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Tokens of translated page text: a word, hyphens plus the one separator they swallow, or a space run
+_PAGE_TOKEN_RE = re.compile(r"[^ -]+|-+ ?| +")
+
+
+@lru_cache(maxsize=None)
+def _parse_kindle_position(pos: str) -> Optional[Tuple[float, float]]:
+    """
+    Convert a Kindle position string to PDF (x, y) on the standard page rect.
+
+    Cached because the same start/end strings are parsed by both the margin-based and the
+    position-based quad builders, and annotations frequently share boundaries. The cache is
+    unbounded so every distinct string of a document is parsed exactly once, however many
+    annotations it has; PDFAnnotator.close_pdf clears it. Returns None if the string is malformed
+    or the coordinate converter could not be imported.
+    """
+    if convert_kindle_to_pdf_coordinates is None:
+        return None
+    parts = pos.split()
+    if len(parts) < 6:
+        return None
+    try:
+        # Extract kindle_x and kindle_y (parts 4 and 5 in the position string)
+        kindle_x = float(parts[4])  # e.g., 424 or 317
+        kindle_y = float(parts[5])  # e.g., 338 or 410
+    except ValueError:
+        return None
+
+    # Convert using a standard PDF rect (we don't have access to the actual rect here)
+    # This matches the approach used in amazon_coordinate_system.py
+    return convert_kindle_to_pdf_coordinates(kindle_x, kindle_y, _STANDARD_PDF_RECT)
+
+
+class _PageTextNormTable(dict):
+    """
+    str.translate table for page text, filled in lazily per code point: letters and digits are
+    lower-cased, hyphens are kept for stitching and everything else becomes a space. Characters
+    whose lower-case form is longer than one character map to that form, so the translated text
+    changes length and the caller can tell that the per-char fallback is needed.
+    """
+
+    def __missing__(self, code: int) -> str:
+        c = chr(code).lower()
+        if len(c) == 1 and c != "-" and not c.isalnum():
+            c = " "
+        self[code] = c
+        return c
+
+
+_PAGE_TEXT_NORM_TABLE = _PageTextNormTable()
+
+
+class _TokenNormTable(dict):
+    """
+    str.translate table that lower-cases a word and drops everything but ASCII letters and
+    digits, filled in lazily per code point. Equivalent to _NON_ALNUM_RE.sub("", s.lower()).
+    """
+
+    def __missing__(self, code: int) -> str:
+        kept = _NON_ALNUM_RE.sub("", chr(code).lower())
+        self[code] = kept
+        return kept
+
+
+_TOKEN_NORM_TABLE = _TokenNormTable()
+
+
+def _normalize_page_text(text: str) -> Optional[Tuple[str, array]]:
+    """
+    Normalize page text the same way as the per-char loop in _page_char_index.
+
+    Hyphens are removed together with one immediately following separator, separator runs
+    collapse to a single space and leading separators are dropped. Returns the normalized text
+    (not yet stripped) and an int32 array mapping normalized index to index in `text`, or None
+    if lower-casing changes the text length (the map would no longer line up with the chars).
+    """
+    translated = text.translate(_PAGE_TEXT_NORM_TABLE)
+    if len(translated) != len(text):
+        return None
+
+    parts: List[str] = []
+    norm_map = array('i')
+    prev_was_space = False
+    for match in _PAGE_TOKEN_RE.finditer(translated):
+        token = match.group()
+        if token[0] == "-":
+            continue
+        if token[0] == " ":
+            if not prev_was_space and parts:
+                parts.append(" ")
+                norm_map.append(match.start())
+            prev_was_space = True
+            continue
+        prev_was_space = False
+        parts.append(token)
+        norm_map.extend(range(match.start(), match.end()))
+    return "".join(parts), norm_map
+
 
 class PDFAnnotator:
     """Class to handle embedding annotations into PDF files"""
@@ -28,6 +153,10 @@ class PDFAnnotator:
         self.doc: Optional[fitz.Document] = None
         self.annotations = []
         self.column_detector = None
+        # Per-page text extraction results, keyed by page number
+        self._page_cache: Dict[int, Dict[str, Any]] = {}
+        # Outline entries queued by add_annotations, written with a single set_toc call
+        self._pending_toc: Optional[List[List[Any]]] = None
         
     def open_pdf(self) -> bool:
         """
@@ -50,6 +179,17 @@ class PDFAnnotator:
         if self.doc:
             self.doc.close()
             self.doc = None
+        self._page_cache.clear()
+        _parse_kindle_position.cache_clear()
+
+    def _page_words(self, page: fitz.Page) -> List[Tuple]:
+        """Return page.get_text("words") for the page, extracted once per page"""
+        cache = self._page_cache.setdefault(page.number, {})
+        words = cache.get("words")
+        if words is None:
+            words = page.get_text("words")
+            cache["words"] = words
+        return words
     
     def add_annotations(self, annotations: List[Dict[str, Any]]) -> int:
         """
@@ -71,14 +211,42 @@ class PDFAnnotator:
             pdf_width = ann.get('pdf_width', 0)
             print(f"   [{i}] Annotation: pdf_width={pdf_width}")
         
-        added_count = 0
+        # Group annotations by page so each page is loaded once and all of its annotations are
+        # built against the same cached text extraction. Each Kindle annotation still becomes its
+        # own PDF annotation, since title/content and the blend-mode appearance are per annotation.
+        # Pages are processed serially on purpose: converted Kindle annotations carry their PDF
+        # rects already, so most of the time goes into MuPDF writes to this one document, which
+        # worker processes could not share without reopening and re-extracting every page.
+        # Bookmarks use no page text and are kept out of the grouping, so the outline lists them
+        # in input order.
+        by_page: Dict[Any, List[Dict[str, Any]]] = {}
+        bookmarks: List[Dict[str, Any]] = []
         for annotation in annotations:
-            try:
-                if self._add_single_annotation(annotation):
-                    added_count += 1
-            except Exception as e:
-                logger.warning(f"Failed to add annotation: {e}")
-                continue
+            if str(annotation.get("type", "")).lower() == "bookmark":
+                bookmarks.append(annotation)
+            else:
+                by_page.setdefault(self._annotation_page_number(annotation), []).append(annotation)
+
+        added_count = 0
+        page_count = len(self.doc)
+        # Bookmarks are queued and the outline is rewritten once at the end, instead of reading
+        # and replacing the whole table of contents for every bookmark
+        self._pending_toc = []
+        try:
+            for page_num, page_annotations in [*by_page.items(), (None, bookmarks)]:
+                page = None
+                if isinstance(page_num, int) and 0 <= page_num < page_count:
+                    page = self.doc[page_num]
+                for annotation in page_annotations:
+                    try:
+                        if self._add_single_annotation(annotation, page):
+                            added_count += 1
+                    except Exception as e:
+                        logger.warning(f"Failed to add annotation: {e}")
+                        continue
+            added_count -= self._flush_pending_toc()
+        finally:
+            self._pending_toc = None
         
         print(f"\n✅ PDF ANNOTATOR SUMMARY:")
         print(f"   Total annotations processed: {len(annotations)}")
@@ -86,24 +254,51 @@ class PDFAnnotator:
         
         return added_count
     
-    def _add_single_annotation(self, annotation: Dict[str, Any]) -> bool:
+    def _flush_pending_toc(self) -> int:
+        """
+        Append the queued bookmark entries to the PDF outline with one set_toc call.
+
+        Returns the number of queued bookmarks that could not be written (0 on success).
+        """
+        entries = self._pending_toc
+        if not entries:
+            return 0
+        try:
+            toc = self.doc.get_toc()
+            toc.extend(entries)
+            self.doc.set_toc(toc)
+        except Exception as e:
+            logger.error(f"Error writing {len(entries)} PDF bookmarks: {e}")
+            return len(entries)
+        for _level, bookmark_title, toc_page in entries:
+            logger.info(f"Added PDF bookmark '{bookmark_title}' for page {toc_page}")
+        return 0
+
+    @staticmethod
+    def _annotation_page_number(annotation: Dict[str, Any]) -> Any:
+        """Return the annotation's 0-based page number, or None if it has none"""
+        page_num = annotation.get("page_number")
+        
+        # Handle missing page_number by checking alternative fields
+        if page_num is None:
+            page_num = annotation.get("pdf_page_0based")
+        if page_num is None:
+            page_num = annotation.get("page_index")
+        return page_num
+
+    def _add_single_annotation(self, annotation: Dict[str, Any], page: Optional[fitz.Page] = None) -> bool:
         """
         Add a single annotation to the PDF
         
         Args:
             annotation: Annotation dictionary with location and content
+            page: The already loaded page the annotation belongs to, if the caller has it
             
         Returns:
             True if successful, False otherwise
         """
         content = annotation.get("content", "")
-        page_num = annotation.get("page_number")
-        
-        # Handle missing page_number by checking alternative fields
-        if page_num is None:
-            page_num = annotation.get("pdf_page_0based")
-        if page_num is None:
-            page_num = annotation.get("page_index")
+        page_num = self._annotation_page_number(annotation)
         
         annotation_type = annotation.get("type", "highlight").lower()
         
@@ -115,7 +310,8 @@ class PDFAnnotator:
             logger.warning(f"Invalid page number: {page_num}")
             return False
 
-        page = self.doc[page_num]
+        if page is None:
+            page = self.doc[page_num]
         
         if annotation_type == "highlight":
             return self._add_highlight_annotation(page, content, annotation)
@@ -143,7 +339,7 @@ class PDFAnnotator:
                 else:
                     # Regular highlight - no content
                     highlight.set_info(title="Kindle Highlight")
-                highlight.set_colors(stroke=[1, 1, 0])  # Yellow
+                highlight.set_colors(stroke=_HIGHLIGHT_COLOR)
                 highlight.update()
                 return True
             else:
@@ -194,7 +390,6 @@ class PDFAnnotator:
             timestamp = annotation.get("timestamp", "")
             if timestamp:
                 # Format timestamp for bookmark title
-                import datetime
                 try:
                     dt = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
                     formatted_time = dt.strftime("%Y-%m-%d %H:%M")
@@ -204,12 +399,17 @@ class PDFAnnotator:
             else:
                 bookmark_title = "Kindle Bookmark"
             
+            # Add new bookmark entry: [level, title, page_number]
+            new_bookmark = [1, bookmark_title, page_num + 1]  # Page numbers are 1-based in TOC
+            
+            # Inside add_annotations the entry is queued and written with the others at the end
+            if self._pending_toc is not None:
+                self._pending_toc.append(new_bookmark)
+                return True
+            
             # Create the bookmark entry in the PDF outline
             # Get current table of contents (list of [level, title, page] entries)
             toc = getattr(self.doc, 'get_toc', lambda: [])()
-            
-            # Add new bookmark entry: [level, title, page_number]
-            new_bookmark = [1, bookmark_title, page_num + 1]  # Page numbers are 1-based in TOC
             toc.append(new_bookmark)
             
             # Set the updated table of contents
@@ -227,13 +427,22 @@ class PDFAnnotator:
             logger.error(f"Error adding bookmark on page {page_no}: {e}")
             return False
 
-    def _build_highlight_quads(self, page: fitz.Page, annotation: Dict[str, Any]) -> Optional[List[fitz.Rect]]:
-        """Build a set of rectangles that track each highlighted line using text search quads for snake pattern"""
-        content = (annotation.get("content") or "").strip()
-        
+    def _build_highlight_quads(self, page: fitz.Page, annotation: Dict[str, Any]) -> Optional[List[Any]]:
+        """
+        Build a set of rectangles that track each highlighted line using text search quads for snake pattern.
+
+        Sources are tried from cheapest and most precise to most expensive, returning on the first
+        hit: precise quads, pre-converted PDF rect, segment rects, margins, then positions. Converted
+        Kindle annotations normally stop at the second step without touching the page text.
+        The result is a list of fitz.Quad, fitz.Rect or plain (x0, y0, x1, y1) tuples, all of
+        which page.add_highlight_annot accepts.
+        """
         # PRIORITY 0: Use precise_quads from text-based matching (gives perfect snake pattern)
         precise_quads = annotation.get("precise_quads")
         if precise_quads:
+            # Common case: all entries are already Quads from search_for(..., quads=True)
+            if all(isinstance(quad, fitz.Quad) for quad in precise_quads):
+                return list(precise_quads)
             # Keep as Quad objects - don't convert to Rects!
             # PyMuPDF preserves multi-quad annotations better when using Quad objects directly
             quad_objects = []
@@ -297,10 +506,11 @@ class PDFAnnotator:
             
         return None
 
-    def _build_quads_from_margins(self, page: fitz.Page, annotation: Dict[str, Any]) -> Optional[List[fitz.Rect]]:
+    def _build_quads_from_margins(self, page: fitz.Page, annotation: Dict[str, Any]) -> Optional[List[Tuple[float, float, float, float]]]:
         """
         Build highlight rectangles using proper Kindle snake pattern.
         Snake pattern: first line (start→right), middle lines (left→right), last line (left→end)
+        Rectangles are returned as plain (x0, y0, x1, y1) tuples.
         """
         # Try to get start and end positions from various sources
         start_pos = None
@@ -352,6 +562,7 @@ class PDFAnnotator:
                 end_pos = (x1, y1)
         
         # If still no positions, try to estimate from page margins and content
+        page_margins = None
         if not start_pos or not end_pos:
             # Use page margins as fallback - create full-width highlighting
             page_margins = self._get_page_text_margins(page)
@@ -376,32 +587,6 @@ class PDFAnnotator:
             print(f"   end_pos: ({ex}, {ey})")
             print(f"   coordinates from annotation: {annotation.get('coordinates')}")
         
-        # Get column constraints for this annotation
-        column_margins = None
-        if self.column_detector:
-            column = self.column_detector.get_column_for_position(page.number, sx, sy)
-            if column:
-                column_margins = {
-                    'left': column['left'],
-                    'right': column['right'],
-                    'top': column['top'],
-                    'bottom': column['bottom']
-                }
-        
-        # Calculate page text margins by examining some text (fallback if no column detection)
-        page_margins = self._get_page_text_margins(page)
-        if not page_margins:
-            # Fallback to reasonable defaults
-            page_margins = {
-                'left': 50,
-                'right': page.rect.width - 50,
-                'top': 50,
-                'bottom': page.rect.height - 50
-            }
-        
-        # Use column margins if available, otherwise fall back to page margins
-        effective_margins = column_margins if column_margins else page_margins
-        
         # Use the exact line height from test data (16 pixels between lines in the test)
         line_height = 16  # Matches the test line spacing
         
@@ -412,35 +597,54 @@ class PDFAnnotator:
         estimated_lines = max(1, round(total_height / line_height) + 1)  # +1 to include partial lines
         
         # CRITICAL FIX: For proper Kindle snake pattern, we need to identify which line is which
-        # and apply the correct margins regardless of the word positions
-        quads = []
-        
-        for line_index in range(estimated_lines):
-            current_y = y_top + (line_index * line_height)
-            line_bottom = current_y + line_height
+        # and apply the correct margins regardless of the word positions.
+        # Horizontal spans per line, built up front rather than branching on every line:
+        if estimated_lines == 1:
+            # Single line: use exact start to end positions (no margins needed)
+            spans = [(sx, ex)]
+        else:
+            # Get column constraints for this annotation
+            column_margins = None
+            if self.column_detector:
+                column = self.column_detector.get_column_for_position(page.number, sx, sy)
+                if column:
+                    column_margins = {
+                        'left': column['left'],
+                        'right': column['right'],
+                        'top': column['top'],
+                        'bottom': column['bottom']
+                    }
             
-            # Determine X coordinates based on Kindle snake pattern with column constraints
-            if estimated_lines == 1:
-                # Single line: use exact start to end positions
-                x0, x1 = sx, ex
-            elif line_index == 0:
-                # First line: start at start position, extend to right margin of column
-                x0 = sx
-                x1 = effective_margins['right']
-            elif line_index == estimated_lines - 1:
-                # Last line: start at left margin of column, end at end position  
-                x0 = effective_margins['left']
-                x1 = ex
+            # Use column margins if available, otherwise fall back to page text margins
+            # (fetched at most once per call, and only when there is no column)
+            if column_margins:
+                effective_margins = column_margins
             else:
-                # Middle lines: span full width of column (not entire page)
-                # This is the core of the column-aware snake pattern
-                x0 = effective_margins['left']
-                x1 = effective_margins['right']
-            
-            # Create rectangle for this line (ensure valid rectangle)
-            if x1 > x0:  # Ensure non-degenerate rectangle
-                rect = fitz.Rect(x0, current_y, x1, line_bottom)
-                quads.append(rect)
+                if page_margins is None:
+                    page_margins = self._get_page_text_margins(page)
+                if not page_margins:
+                    # Fallback to reasonable defaults
+                    page_margins = {
+                        'left': 50,
+                        'right': page.rect.width - 50,
+                        'top': 50,
+                        'bottom': page.rect.height - 50
+                    }
+                effective_margins = page_margins
+
+            # First line: start position to the column's right margin; middle lines: full
+            # column width (not entire page); last line: left margin of column to end position
+            left = effective_margins['left']
+            right = effective_margins['right']
+            spans = [(sx, right)] + [(left, right)] * (estimated_lines - 2) + [(left, ex)]
+
+        # Create a rectangle per line, skipping degenerate ones
+        line_tops = [y_top + line_index * line_height for line_index in range(estimated_lines)]
+        quads = [
+            (x0, current_y, x1, current_y + line_height)
+            for (x0, x1), current_y in zip(spans, line_tops)
+            if x1 > x0
+        ]
                 
         return quads if quads else None
 
@@ -449,16 +653,22 @@ class PDFAnnotator:
         Calculate the actual text margins on the page by examining text placement.
         Returns dict with 'left', 'right', 'top', 'bottom' margins.
         For right margin, use a reasonable margin within page bounds rather than max text extent.
+        The result is computed once per page and shared by every annotation on it.
         """
+        cache = self._page_cache.setdefault(page.number, {})
+        if "margins" not in cache:
+            cache["margins"] = self._compute_page_text_margins(page)
+        return cache["margins"]
+
+    def _compute_page_text_margins(self, page: fitz.Page) -> Optional[Dict[str, float]]:
+        """Compute the page text margins returned by _get_page_text_margins"""
         try:
-            words = page.get_text("words")
+            words = self._page_words(page)
             if not words:
                 return None
                 
-            # Calculate text bounds
-            all_x0 = [w[0] for w in words]
-            all_y0 = [w[1] for w in words]
-            all_y1 = [w[3] for w in words]
+            # Calculate text bounds: transpose the word tuples once and reduce whole columns
+            all_x0, all_y0, _, all_y1 = tuple(zip(*words))[:4]
             
             text_left = min(all_x0)
             text_top = min(all_y0)
@@ -485,74 +695,67 @@ class PDFAnnotator:
         except Exception:
             return None
 
-    def _rects_per_line(self, words: List[Tuple], indices: List[int]) -> Optional[List[fitz.Rect]]:
+    def _rects_per_line(self, words: List[Tuple], indices: List[int]) -> Optional[List[Tuple[float, float, float, float]]]:
         """
         Create snake-pattern highlight rectangles from word indices.
         This creates the Kindle-style "snake" pattern where:
         - First line: start at first word, extend to right margin
         - Middle lines: full width from left to right margin
         - Last line: start at left margin, end at last word
+        Rectangles are returned as plain (x0, y0, x1, y1) tuples.
         """
         if not indices or not words:
             return None
             
-        # Group word indices by line
-        from collections import defaultdict
-        line_groups: Dict[Tuple[int, int], List[int]] = defaultdict(list)
-        
+        # Reduce matched words to [x0, y0, x1, y1] extents per line in a single pass
+        n_words = len(words)
+        line_extents: Dict[Tuple[int, int], List[float]] = {}
         for word_idx in indices:
-            if 0 <= word_idx < len(words):
+            if 0 <= word_idx < n_words:
                 word = words[word_idx]
                 # word format: (x0, y0, x1, y1, text, block_num, line_num, word_num)
                 line_key = (word[5], word[6])  # (block_num, line_num)
-                line_groups[line_key].append(word_idx)
+                ext = line_extents.get(line_key)
+                if ext is None:
+                    line_extents[line_key] = [word[0], word[1], word[2], word[3]]
+                    continue
+                if word[0] < ext[0]:
+                    ext[0] = word[0]
+                if word[1] < ext[1]:
+                    ext[1] = word[1]
+                if word[2] > ext[2]:
+                    ext[2] = word[2]
+                if word[3] > ext[3]:
+                    ext[3] = word[3]
         
-        if not line_groups:
+        if not line_extents:
             return None
             
         # Sort lines by block and line number
-        sorted_lines = sorted(line_groups.keys(), key=lambda k: (k[0], k[1]))
+        sorted_lines = sorted(line_extents)
         total_lines = len(sorted_lines)
         
         # Find block bounds from first matched word
         first_word_idx = indices[0]
         first_word = words[first_word_idx]
-        block_rect = None
-        
-        # Try to find the containing text block for paragraph bounds
-        try:
-            # Get all blocks and find the one containing our first word
-            blocks = first_word  # We need to get blocks from the page, but we don't have page here
-            # For now, we'll estimate paragraph bounds from the words themselves
-            
-            # Find all words in the same block as our matched words
-            target_block_num = first_word[5]
-            block_words = [w for w in words if w[5] == target_block_num]
-            
-            if block_words:
-                # Calculate block bounds from all words in the block
-                block_left = min(w[0] for w in block_words)
-                block_right = max(w[2] for w in block_words)
-            else:
-                # Fallback: use matched words bounds
-                block_left = min(words[idx][0] for idx in indices)
-                block_right = max(words[idx][2] for idx in indices)
-        except:
-            # Fallback calculation
-            block_left = min(words[idx][0] for idx in indices)
-            block_right = max(words[idx][2] for idx in indices)
-        
+
+        # Estimate paragraph bounds from all words in the same block as our first matched word,
+        # tracking left and right edges in a single pass
+        target_block_num = first_word[5]
+        block_left = first_word[0]
+        block_right = first_word[2]
+        for w in words:
+            if w[5] == target_block_num:
+                if w[0] < block_left:
+                    block_left = w[0]
+                if w[2] > block_right:
+                    block_right = w[2]
+
         quads = []
         
         for line_idx, line_key in enumerate(sorted_lines):
-            word_indices_in_line = line_groups[line_key]
-            
-            # Get bounding box of matched words on this line
-            line_words = [words[idx] for idx in word_indices_in_line]
-            word_left = min(w[0] for w in line_words)
-            word_right = max(w[2] for w in line_words)
-            word_top = min(w[1] for w in line_words)
-            word_bottom = max(w[3] for w in line_words)
+            # Bounding box of matched words on this line
+            word_left, word_top, word_right, word_bottom = line_extents[line_key]
             
             # Apply snake pattern logic
             if total_lines == 1:
@@ -573,8 +776,7 @@ class PDFAnnotator:
                 rect_right = block_right
             
             # Create the rectangle for this line
-            rect = fitz.Rect(rect_left, word_top, rect_right, word_bottom)
-            quads.append(rect)
+            quads.append((rect_left, word_top, rect_right, word_bottom))
         
         return quads if quads else None
 
@@ -586,125 +788,203 @@ class PDFAnnotator:
             return []
 
         def norm_token(s: str) -> str:
-            return re.sub(r"[^a-z0-9]", "", s.lower())
+            return s.translate(_TOKEN_NORM_TABLE)
 
         # Simple approach: try to find the first few words of the content
         content_words = content.lower().split()[:5]  # Take first 5 words
         if not content_words:
             return []
-            
-        # Look for the start of the sequence
-        for start_idx in range(len(words)):
-            match_indices = []
-            word_idx = start_idx
-            content_idx = 0
-            
-            while content_idx < len(content_words) and word_idx < len(words):
-                word_text = words[word_idx][4] if len(words[word_idx]) > 4 else ""
-                content_word = content_words[content_idx]
-                
-                # Normalize both for comparison
-                norm_word = norm_token(word_text)
-                norm_content = norm_token(content_word)
-                
+
+        # Normalize every page word and content word once, not once per candidate start
+        norm_words = [norm_token(w[4]) if len(w) > 4 else "" for w in words]
+        norm_content = [norm_token(cw) for cw in content_words]
+        first_content = norm_content[0]
+        if not first_content:
+            return []
+        n_words = len(words)
+        n_content = len(norm_content)
+
+        # A scan only starts matching at a word that matches the first content word, so only
+        # those words are tried as starts (every start in between would reach the same word)
+        for start_idx, first_word in enumerate(norm_words):
+            if not first_word or not (first_word in first_content or first_content in first_word):
+                continue
+            match_indices = [start_idx]
+            word_idx = start_idx + 1
+            content_idx = 1
+
+            while content_idx < n_content and word_idx < n_words:
+                norm_word = norm_words[word_idx]
+                norm_content_word = norm_content[content_idx]
+
                 # Check if this word matches or partially matches
-                if norm_word and norm_content:
-                    if norm_word == norm_content or norm_word in norm_content or norm_content in norm_word:
+                if norm_word and norm_content_word:
+                    if norm_word in norm_content_word or norm_content_word in norm_word:
                         match_indices.append(word_idx)
                         content_idx += 1
-                    elif len(match_indices) == 0:
-                        # Haven't started matching yet, continue looking
-                        pass
                     else:
                         # We were matching but this word doesn't match, stop
                         break
-                        
+
                 word_idx += 1
             
             # If we matched the first few words, assume we found the right sequence
-            if len(match_indices) >= min(3, len(content_words)):
+            if len(match_indices) >= min(3, n_content):
                 # Return all words from first match to end of annotation (estimate)
-                estimated_end = min(len(words), match_indices[-1] + len(content.split()) + 5)
+                estimated_end = min(n_words, match_indices[-1] + len(content.split()) + 5)
                 return list(range(match_indices[0], estimated_end))
         
         return []
 
     # --- Char-based robust fallback for matching and quad construction ---
-    def _build_quads_via_chars(self, page: fitz.Page, content: str) -> Optional[List[fitz.Rect]]:
+    def _page_char_index(self, page: fitz.Page) -> Optional[Dict[str, Any]]:
         """
-        Build highlight rectangles by matching the content against the page's character stream.
-        Normalization rules:
-        - lower-case
-        - collapse whitespace to single spaces
-        - remove all hyphens '-' from both page and content for matching (line-break hyphenation and in-word hyphens)
-        - if a hyphen is removed, also remove a single immediate following whitespace to stitch words (handles line-break hyphenation)
-        This provides robust matching across line-break hyphenation (e.g., 'special-' + 'purpose').
+        Normalize the page's character stream once and cache it for every annotation on the page.
+
+        Returns a dict with the normalized page text ('norm_page'), the map from normalized index to
+        original char index ('norm_map', an int32 array), per-char columns 'x0', 'y0', 'x1', 'y1' and 'line'
+        ((block, line) key), and 'line_order' mapping each (block, line) key to its position in
+        reading order, 'block_x' mapping block numbers to the block's (left, right) edges, or None
+        if the page has no usable text.
         """
-        if not content:
-            return None
+        cache = self._page_cache.setdefault(page.number, {})
+        if "char_index" in cache:
+            return cache["char_index"]
+        cache["char_index"] = None
 
+        # PyMuPDF has no "chars" extraction mode, so flatten the rawdict hierarchy into
+        # (x0, y0, x1, y1, ch, block, line, span) tuples in reading order
         try:
-            chars = page.get_text("chars")  # (x0, y0, x1, y1, ch, block, line, span)
+            raw = page.get_text("rawdict", flags=_RAWDICT_TEXT_FLAGS)
         except Exception:
             return None
+        chars = [
+            (*char["bbox"], char["c"], block.get("number", 0), line_no, span_no)
+            for block in raw.get("blocks", [])
+            for line_no, line in enumerate(block.get("lines", []))
+            for span_no, span in enumerate(line.get("spans", []))
+            for char in span.get("chars", [])
+        ]
         if not chars:
             return None
+        block_x = {
+            block.get("number", 0): (block["bbox"][0], block["bbox"][2])
+            for block in raw.get("blocks", [])
+            if "bbox" in block
+        }
 
-        norm_page_chars: list[str] = []
-        norm_map: list[int] = []  # maps normalized index -> original char index in `chars`
+        n_chars = len(chars)
+        columns = tuple(zip(*chars))  # transpose to (x0s, y0s, x1s, y1s, chs, blocks, lines, spans)
+        page_text = "".join(columns[4])
+        normalized = _normalize_page_text(page_text) if len(page_text) == n_chars else None
 
-        def is_space(ch: str) -> bool:
-            return ch.isspace()
+        if normalized is not None:
+            # Fast path: the columns come straight from the transposed tuples and the text is
+            # normalized with one translate plus a regex scan instead of a per-char loop
+            char_x0 = array('d', columns[0])
+            char_y0 = array('d', columns[1])
+            char_x1 = array('d', columns[2])
+            char_y1 = array('d', columns[3])
+            char_line = list(zip(columns[5], columns[6]))
+            line_order = {key: pos for pos, key in enumerate(dict.fromkeys(char_line))}
+            norm_page, norm_map = normalized
+        else:
+            norm_page_chars: List[str] = []
+            norm_map = array('i')  # maps normalized index -> original char index in `chars`
+
+            # Struct-of-arrays view of `chars`: one column per field, indexed like `chars`.
+            # Coordinates live in unboxed double arrays rather than per-char tuples.
+            char_x0 = array('d', bytes(8 * n_chars))
+            char_y0 = array('d', bytes(8 * n_chars))
+            char_x1 = array('d', bytes(8 * n_chars))
+            char_y1 = array('d', bytes(8 * n_chars))
+            char_line: List[Tuple[int, int]] = [(0, 0)] * n_chars  # (block, line) per char
+            line_order: Dict[Tuple[int, int], int] = {}  # (block, line) -> reading-order position
 
-        prev_was_space = False
-        skip_next_space = False
-        for idx, char_data in enumerate(chars):
-            # Handle variable char data formats - sometimes it's a dict, sometimes a tuple
-            if isinstance(char_data, dict):
-                x0, y0, x1, y1 = char_data['bbox']
-                ch = char_data['c']
-                block = char_data.get('block', 0)
-                line = char_data.get('line', 0)
-                span = char_data.get('span', 0)
-            elif isinstance(char_data, (list, tuple)) and len(char_data) >= 5:
-                # Handle tuple format: (x0, y0, x1, y1, ch, block?, line?, span?)
-                x0, y0, x1, y1, ch = char_data[:5]
-                block = char_data[5] if len(char_data) > 5 else 0
-                line = char_data[6] if len(char_data) > 6 else 0
-                span = char_data[7] if len(char_data) > 7 else 0
-            else:
-                # Skip malformed character data
-                continue
-                
-            c = ch.lower()
-            if c == '-':
-                # Remove hyphens (stitch words) and skip one immediate following space/newline
-                skip_next_space = True
-                continue
-            # Treat non-alnum as separators (punctuation) or whitespace
-            if (not c.isalnum()) or c.isspace():
-                if skip_next_space:
-                    skip_next_space = False
-                    continue
-                if not prev_was_space and norm_page_chars:
-                    norm_page_chars.append(' ')
-                    norm_map.append(idx)
-                prev_was_space = True
-                continue
             prev_was_space = False
             skip_next_space = False
-            norm_page_chars.append(c)
-            norm_map.append(idx)
+            for idx, (x0, y0, x1, y1, ch, block, line, _span) in enumerate(chars):
+                char_x0[idx] = x0
+                char_y0[idx] = y0
+                char_x1[idx] = x1
+                char_y1[idx] = y1
+                key = (block, line)
+                char_line[idx] = key
+                if key not in line_order:
+                    line_order[key] = len(line_order)
 
-        norm_page = ''.join(norm_page_chars).strip()
+                c = ch.lower()
+                if c == '-':
+                    # Remove hyphens (stitch words) and skip one immediate following space/newline
+                    skip_next_space = True
+                    continue
+                # Treat non-alnum as separators (punctuation) or whitespace
+                if (not c.isalnum()) or c.isspace():
+                    if skip_next_space:
+                        skip_next_space = False
+                        continue
+                    if not prev_was_space and norm_page_chars:
+                        norm_page_chars.append(' ')
+                        norm_map.append(idx)
+                    prev_was_space = True
+                    continue
+                prev_was_space = False
+                skip_next_space = False
+                norm_page_chars.append(c)
+                norm_map.append(idx)
+
+            norm_page = ''.join(norm_page_chars)
+
+        norm_page = norm_page.strip()
         if not norm_page:
             return None
 
-        # Normalize content: remove hyphens (stitch), convert other punctuation to spaces, collapse spaces
-        content_norm = content.lower()
-        content_norm = content_norm.replace('-', '')
-        content_norm = re.sub(r"[^a-z0-9]+", " ", content_norm)
-        content_norm = re.sub(r"\s+", " ", content_norm).strip()
+        char_index = {
+            "norm_page": norm_page,
+            "norm_map": norm_map,
+            "x0": char_x0,
+            "y0": char_y0,
+            "x1": char_x1,
+            "y1": char_y1,
+            "line": char_line,
+            "line_order": line_order,
+            "block_x": block_x,
+        }
+        cache["char_index"] = char_index
+        return char_index
+
+    def _build_quads_via_chars(self, page: fitz.Page, content: str) -> Optional[List[Tuple[float, float, float, float]]]:
+        """
+        Build highlight rectangles by matching the content against the page's character stream.
+        Normalization rules:
+        - lower-case
+        - collapse whitespace to single spaces
+        - remove all hyphens '-' from both page and content for matching (line-break hyphenation and in-word hyphens)
+        - if a hyphen is removed, also remove a single immediate following whitespace to stitch words (handles line-break hyphenation)
+        This provides robust matching across line-break hyphenation (e.g., 'special-' + 'purpose').
+        Rectangles are returned as plain (x0, y0, x1, y1) tuples.
+        """
+        if not content:
+            return None
+
+        # Normalize content first so empty or single-char content never touches the page text:
+        # remove hyphens (stitch), turn each run of other non-alnum chars (punctuation and
+        # whitespace alike) into a single space
+        content_norm = _NON_ALNUM_RE.sub(" ", content.lower().translate(_HYPHEN_DELETE)).strip()
+        if len(content_norm) < 2:
+            return None
+
+        char_index = self._page_char_index(page)
+        if char_index is None:
+            return None
+        norm_page = char_index["norm_page"]
+        norm_map = char_index["norm_map"]
+        char_x0 = char_index["x0"]
+        char_y0 = char_index["y0"]
+        char_x1 = char_index["x1"]
+        char_y1 = char_index["y1"]
+        char_line = char_index["line"]
+        line_order = char_index["line_order"]
 
         # Substring search
         start = norm_page.find(content_norm)
@@ -720,48 +1000,48 @@ class PDFAnnotator:
         if not match_char_indices:
             return None
 
-        # Group matched chars by (block, line) to build snake quads
-        from collections import defaultdict as _dd
-        by_line: dict[tuple[int, int], list[int]] = _dd(list)
-        for nidx in range(start, end):
-            orig_idx = norm_map[nidx]
-            x0, _y0, x1, _y1, _ch, b, ln, _sp = chars[orig_idx]
-            by_line[(b, ln)].append(orig_idx)
+        # Reduce matched chars to one bbox per (block, line) in a single pass over the columns
+        by_line: Dict[Tuple[int, int], List[float]] = {}
+        # (each column is read once per char; the key comes from the precomputed 'line' column)
+        for orig_idx in match_char_indices:
+            cx0 = char_x0[orig_idx]
+            cy0 = char_y0[orig_idx]
+            cx1 = char_x1[orig_idx]
+            cy1 = char_y1[orig_idx]
+            key = char_line[orig_idx]
+            ext = by_line.get(key)
+            if ext is None:
+                by_line[key] = [cx0, cy0, cx1, cy1]
+                continue
+            if cx0 < ext[0]:
+                ext[0] = cx0
+            if cy0 < ext[1]:
+                ext[1] = cy0
+            if cx1 > ext[2]:
+                ext[2] = cx1
+            if cy1 > ext[3]:
+                ext[3] = cy1
 
         if not by_line:
             return None
 
-        # Determine block bounds (pick the block containing the first matched char)
+        # Determine block bounds: the block the first matched char belongs to
         first_idx = match_char_indices[0]
-        block_rect = None
-        try:
-            for blk in page.get_text("blocks"):
-                r = fitz.Rect(blk[:4])
-                cx0, cy0, cx1, cy1, _ch, _b, _ln, _sp = chars[first_idx]
-                if r.contains(fitz.Rect(cx0, cy0, cx1, cy1)):
-                    block_rect = r
-                    break
-        except Exception:
-            block_rect = None
+        block_x = char_index["block_x"].get(char_line[first_idx][0])  # (left, right) of that block
 
-        # Order lines by their natural order
-        ordered_keys = sorted(by_line.keys(), key=lambda k: k[1])  # sort by line number only
+        # Order lines by the page's reading order (block first, then line within the block)
+        ordered_keys = sorted(by_line.keys(), key=line_order.__getitem__)
         total_lines = len(ordered_keys)
 
         # For each line, compute rects following snake rules
-        quads: list[fitz.Rect] = []
+        quads: List[Tuple[float, float, float, float]] = []
         for i, key in enumerate(ordered_keys):
-            orig_indices = by_line[key]
-            # Compute the bbox union of matched chars on this line
-            xs0 = min(chars[j][0] for j in orig_indices)
-            ys0 = min(chars[j][1] for j in orig_indices)
-            xs1 = max(chars[j][2] for j in orig_indices)
-            ys1 = max(chars[j][3] for j in orig_indices)
+            # Bbox union of matched chars on this line
+            xs0, ys0, xs1, ys1 = by_line[key]
 
             # Line full width candidates from the block, else fallback to matched extents
-            if block_rect is not None:
-                line_x0 = block_rect.x0
-                line_x1 = block_rect.x1
+            if block_x is not None:
+                line_x0, line_x1 = block_x
             else:
                 line_x0 = xs0
                 line_x1 = xs1
@@ -778,7 +1058,7 @@ class PDFAnnotator:
                 # Middle lines: full block width
                 x0, x1 = line_x0, line_x1
 
-            quads.append(fitz.Rect(x0, ys0, x1, ys1))
+            quads.append((x0, ys0, x1, ys1))
 
         return quads if quads else None
     
@@ -786,27 +1066,54 @@ class PDFAnnotator:
         """Parse a Kindle-style position string like '135 0 1414 1 424 338 10 14' and return PDF (x, y)."""
         if not pos:
             return None
-        try:
-            parts = [float(p) for p in str(pos).strip().split()]
-            if len(parts) >= 6:
-                # Extract kindle_x and kindle_y (parts 4 and 5 in the position string)
-                kindle_x = parts[4]  # e.g., 424 or 317 
-                kindle_y = parts[5]  # e.g., 338 or 410
-                
-                # Convert from Kindle coordinates to PDF coordinates using Amazon system
-                from ..kindle_parser.amazon_coordinate_system import convert_kindle_to_pdf_coordinates
-                
-                # Use a standard PDF rect for conversion (we don't have access to actual rect here)
-                # This matches the approach used in amazon_coordinate_system.py
-                standard_pdf_rect = type('Rect', (), {'width': 595.3, 'height': 841.9})()
-                pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(kindle_x, kindle_y, standard_pdf_rect)
-                
-                return pdf_x, pdf_y
-        except Exception:
-            return None
-        return None
+        return _parse_kindle_position(str(pos))
 
-    def _build_quads_from_positions(self, page: fitz.Page, start_pos: Optional[str], end_pos: Optional[str]) -> Optional[List[fitz.Rect]]:
+    def _page_lines(self, page: fitz.Page) -> Tuple[List[Tuple[Tuple[int, int], float, float, float, float]], List[float]]:
+        """
+        Return the page's text lines as (key, x0, y0, x1, y1) tuples sorted by top Y,
+        together with the list of their top Y values for bisecting. Computed once per page.
+        """
+        cache = self._page_cache.setdefault(page.number, {})
+        lines = cache.get("lines")
+        if lines is not None:
+            return lines
+
+        words = self._page_words(page)
+
+        # Reduce words to [x0, y0, x1, y1] extents per (block, line) in a single pass
+        line_extents: Dict[Tuple[int, int], List[float]] = {}
+        for w in words:
+            key = (w[5], w[6])
+            ext = line_extents.get(key)
+            if ext is None:
+                line_extents[key] = [w[0], w[1], w[2], w[3]]
+                continue
+            if w[0] < ext[0]:
+                ext[0] = w[0]
+            if w[1] < ext[1]:
+                ext[1] = w[1]
+            if w[2] > ext[2]:
+                ext[2] = w[2]
+            if w[3] > ext[3]:
+                ext[3] = w[3]
+
+        # Build ordered lines with x/y extents
+        lines_ordered: List[Tuple[Tuple[int, int], float, float, float, float]] = [
+            (key, x0, y0, x1, y1) for key, (x0, y0, x1, y1) in line_extents.items()
+        ]
+        # Sort by top Y
+        lines_ordered.sort(key=lambda it: it[2])
+
+        lines = (lines_ordered, [it[2] for it in lines_ordered])
+        cache["lines"] = lines
+        return lines
+
+    def _build_quads_from_positions(self, page: fitz.Page, start_pos: Optional[str], end_pos: Optional[str]) -> Optional[List[Tuple[float, float, float, float]]]:
+        """
+        Build snake-pattern line rectangles between two Kindle position strings.
+        Rectangles are returned as plain (x0, y0, x1, y1) tuples, which page.add_highlight_annot
+        accepts directly, so no fitz.Rect is constructed per line.
+        """
         start_xy = self._parse_position_xy(start_pos)
         end_xy = self._parse_position_xy(end_pos)
         if not start_xy or not end_xy:
@@ -815,100 +1122,123 @@ class PDFAnnotator:
         ex, ey = end_xy
         y_top, y_bottom = (sy, ey) if sy <= ey else (ey, sy)
 
-        words = page.get_text("words")
-        if not words:
+        lines_ordered, line_tops = self._page_lines(page)
+        if not lines_ordered:
             return None
 
-        # Group words by (block, line)
-        from collections import defaultdict
-        line_lookup: Dict[Tuple[int, int], List[Tuple]] = defaultdict(list)
-        for w in words:
-            line_lookup[(w[5], w[6])].append(w)
-
-        # Build ordered lines with x/y extents
-        lines_ordered: List[Tuple[Tuple[int, int], float, float, float, float]] = []
-        for key, lst in line_lookup.items():
-            x0 = min(w[0] for w in lst)
-            x1 = max(w[2] for w in lst)
-            y0 = min(w[1] for w in lst)
-            y1 = max(w[3] for w in lst)
-            lines_ordered.append((key, x0, y0, x1, y1))
-        # Sort by top Y
-        lines_ordered.sort(key=lambda it: it[2])
-
         # Select lines whose vertical span intersects [y_top, y_bottom]
-        # it tuple: (key, lx0, ly0, lx1, ly1)
-        selected = [it for it in lines_ordered if not (it[4] < y_top or it[2] > y_bottom)]
-        logger.debug(
-            f"pos-fallback: y_top={y_top:.2f}, y_bottom={y_bottom:.2f}, "
-            f"lines={len(lines_ordered)}, selected={len(selected)}"
-        )
+        # it tuple: (key, lx0, ly0, lx1, ly1); lines are sorted by top Y, so only those
+        # starting above y_bottom need checking
+        candidates = lines_ordered[:bisect_right(line_tops, y_bottom)]
+        selected = [it for it in candidates if it[4] >= y_top]
+        # Debug output is gated so the messages are not formatted for every annotation when
+        # debug logging is off
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                "pos-fallback: y_top=%.2f, y_bottom=%.2f, lines=%d, selected=%d",
+                y_top, y_bottom, len(lines_ordered), len(selected)
+            )
         if not selected:
             # fallback: include any line whose vertical center lies within the range
-            selected = []
-            for it in lines_ordered:
-                cy = (it[2] + it[4]) / 2.0
-                if y_top - 0.5 <= cy <= y_bottom + 0.5:
-                    selected.append(it)
+            # (bounds hoisted out of the loop; comparing top + bottom against doubled bounds
+            # is exact, since halving a float is)
+            low = 2.0 * (y_top - 0.5)
+            high = 2.0 * (y_bottom + 0.5)
+            selected = [
+                it for it in lines_ordered[:bisect_right(line_tops, y_bottom + 0.5)]
+                if low <= it[2] + it[4] <= high
+            ]
         if not selected:
             return None
 
+        total_lines = len(selected)
+        if total_lines == 1:
+            # Single line (most highlights): the paragraph bounds are the line's own extent,
+            # so the rect is start to end within the line, clamped to it
+            _, para_left, ly0, para_right, ly1 = selected[0]
+            x0 = min(max(sx, para_left), para_right)
+            x1 = min(max(ex, x0 + 0.1), para_right)
+            if x1 > x0 and ly1 > ly0:
+                if debug:
+                    logger.debug("pos-fallback quad[0/1]: (%.1f,%.1f)-(%.1f,%.1f)", x0, ly0, x1, ly1)
+                return [(x0, ly0, x1, ly1)]
+            return None
+
         # Determine paragraph (block) bounds for clamping: intersecting the vertical range
-        # Use actual text bounds rather than block bounds which may extend too far
-        text_left = float('inf')
-        text_right = float('-inf')
-        
-        # Calculate text bounds from all selected lines
-        for _, lx0, ly0, lx1, ly1 in selected:
-            text_left = min(text_left, lx0)
-            text_right = max(text_right, lx1)
-        
-        # Set reasonable paragraph bounds - prefer text bounds over block bounds
-        if text_left != float('inf') and text_right != float('-inf'):
-            para_left = text_left
-            para_right = text_right
-        else:
-            # Fallback to block bounds
-            para_left = 20  # default left margin
-            para_right = 380  # default right margin for typical text
+        # Use actual text bounds rather than block bounds which may extend too far.
+        # selected is non-empty here, so the bounds are always taken from real lines
+        para_left: float = min(it[1] for it in selected)
+        para_right: float = max(it[3] for it in selected)
 
-        quads: List[fitz.Rect] = []
-        total_lines = len(selected)
-        for idx, (_, lx0, ly0, lx1, ly1) in enumerate(selected):
-            # Use our calculated paragraph bounds
-            if total_lines == 1:
-                # Start to end within the same line, clamped to paragraph
-                x0 = min(max(sx, para_left), para_right)
-                x1 = min(max(ex, x0 + 0.1), para_right)
-            elif idx == 0:
-                # First line: start position to paragraph right
-                x0 = max(sx, para_left)
-                x1 = para_right
-            elif idx == total_lines - 1:
-                # Last line: paragraph left to end position
-                x0 = para_left
-                x1 = min(ex, para_right)
-            else:
-                # Middle lines: full paragraph width
-                x0 = para_left
-                x1 = para_right
+        # Keep non-degenerate rects only
+        quads: List[Tuple[float, float, float, float]] = []
+        # First line: start position to paragraph right
+        _, _, ly0, _, ly1 = selected[0]
+        x0 = max(sx, para_left)
+        if para_right > x0 and ly1 > ly0:
+            quads.append((x0, ly0, para_right, ly1))
+        # Middle lines all span the paragraph, so their width check is done once
+        if para_right > para_left:
+            quads.extend(
+                (para_left, it[2], para_right, it[4]) for it in selected[1:-1] if it[4] > it[2]
+            )
+        # Last line: paragraph left to end position
+        _, _, ly0, _, ly1 = selected[-1]
+        x1 = min(ex, para_right)
+        if x1 > para_left and ly1 > ly0:
+            quads.append((para_left, ly0, x1, ly1))
 
-            # Ensure non-degenerate rect
-            if x1 > x0 and ly1 > ly0:
-                rect = fitz.Rect(x0, ly0, x1, ly1)
-                quads.append(rect)
-                logger.debug(f"pos-fallback quad[{idx}/{total_lines}]: ({rect.x0:.1f},{rect.y0:.1f})-({rect.x1:.1f},{rect.y1:.1f})")
+        if debug:
+            for idx, (x0, ly0, x1, ly1) in enumerate(quads):
+                logger.debug(
+                    "pos-fallback quad[%d/%d]: (%.1f,%.1f)-(%.1f,%.1f)",
+                    idx, total_lines, x0, ly0, x1, ly1
+                )
         return quads if quads else None
     
-    def save_pdf(self, output_path: Optional[str] = None) -> bool:
+    def save_pdf(self, output_path: Optional[Union[str, BinaryIO]] = None, compact: bool = False) -> bool:
+        """
+        Save the annotated PDF.
+
+        By default only unreferenced objects are dropped (garbage=1) and content streams are left
+        as they are, so saving cost scales with the annotations added rather than the document size.
+        When writing back to the input file, the changes are appended as an incremental update.
+
+        Args:
+            output_path: Path to write to, or a writable binary file object (e.g. io.BytesIO) to
+                serialize into without touching the filesystem. If None, writes
+                '<stem>_annotated.pdf' next to the input.
+            compact: Fully rewrite the file (garbage=4, clean=True) for the smallest output.
+
+        Returns:
+            True if the file was written, False otherwise.
+        """
         if not self.doc:
             logger.error("No document to save")
             return False
+
+        if hasattr(output_path, "write"):
+            try:
+                if compact:
+                    self.doc.save(output_path, garbage=4, deflate=True, clean=True)
+                else:
+                    self.doc.save(output_path, garbage=1, deflate=True)
+                logger.info("PDF saved to stream")
+                return True
+            except Exception as e:
+                logger.error(f"Error saving PDF to stream: {e}")
+                return False
             
         save_path = Path(output_path) if output_path else self.pdf_path.with_name(f"{self.pdf_path.stem}_annotated.pdf")
         
         try:
-            self.doc.save(str(save_path), garbage=4, deflate=True, clean=True)
+            if compact:
+                self.doc.save(str(save_path), garbage=4, deflate=True, clean=True)
+            elif save_path.resolve() == self.pdf_path.resolve() and self.doc.can_save_incrementally():
+                self.doc.save(str(save_path), incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            else:
+                self.doc.save(str(save_path), garbage=1, deflate=True)
             logger.info(f"PDF saved to {save_path}")
             return True
         except Exception as e:
@@ -917,14 +1247,18 @@ class PDFAnnotator:
 
 # --- Compatibility wrapper for GUI and CLI usage ---
 
-def annotate_pdf_file(pdf_path: str, annotations: List[Dict[str, Any]], output_path: Optional[str] = None) -> bool:
+def annotate_pdf_file(pdf_path: str, annotations: List[Dict[str, Any]],
+                      output_path: Optional[Union[str, BinaryIO]] = None,
+                      compact: bool = False) -> bool:
     """
     Convenience wrapper to annotate a PDF file, maintained for GUI/CLI compatibility.
 
     Args:
         pdf_path: Path to the input PDF file.
         annotations: List of annotation dictionaries in PDFAnnotator format.
-        output_path: Optional path to write the annotated PDF. If None, writes next to input.
+        output_path: Optional path to write the annotated PDF, or a writable binary file object
+            (e.g. io.BytesIO) to receive it in memory. If None, writes next to input.
+        compact: Fully garbage-collect and clean the output file (slower, smaller).
 
     Returns:
         True if the annotated PDF was saved successfully and at least one annotation was added; False otherwise.
@@ -939,6 +1273,6 @@ def annotate_pdf_file(pdf_path: str, annotations: List[Dict[str, Any]], output_p
         if added <= 0:
             logger.warning("No annotations were added to the PDF; not saving output.")
             return False
-        return annotator.save_pdf(output_path)
+        return annotator.save_pdf(output_path, compact=compact)
     finally:
         annotator.close_pdf()
\ No newline at end of file
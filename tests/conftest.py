@@ -0,0 +1,42 @@
+"""
+Shared pytest fixtures for the test suite
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the project root (for "src." and "tests." imports) and src/ (for the modules' own
+# top-level imports) importable once for every test module
+_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(_ROOT / "src"))
+
+from src.pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
+from src.pdf_processor.pdf_annotator import annotate_pdf_file
+from tests.sample_cases import SAMPLE_CASES, cached_amazon_annotations, first_krds_file
+
+
+@pytest.fixture(scope="session")
+def load_amazon_annotations():
+    """
+    Return a loader for create_amazon_compliant_annotations that parses each
+    (KRDS file, clippings file, book name) combination only once per test session.
+
+    Tests must treat the returned annotations as read-only, since later tests share them.
+    """
+    return cached_amazon_annotations
+
+
+@pytest.fixture(scope="session")
+def annotated_peirce_pdf(tmp_path_factory):
+    """
+    Path of the Peirce sample PDF annotated from its KRDS file and clippings, built once per
+    test session in a temporary directory. Tests must not modify the file.
+    """
+    case = SAMPLE_CASES[0]
+    annotations = cached_amazon_annotations(first_krds_file(case.sdr_path), case.clippings_path, case.book_name)
+    output_path = tmp_path_factory.mktemp("annotated") / f"{case.book_name}_annotated.pdf"
+    annotate_pdf_file(str(case.pdf_path), convert_amazon_to_pdf_annotator_format(annotations),
+                      output_path=str(output_path))
+    return output_path
@@ -0,0 +1,125 @@
+"""
+Sample books in examples/sample_data shared by the tests
+"""
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
+
+SAMPLES_DIR = Path("examples/sample_data")
+
+
+@dataclass(frozen=True)
+class SampleCase:
+    """One sample book: its PDF, .sdr folder, MyClippings export and Kindle book name"""
+    name: str
+    pdf_path: Path
+    sdr_path: Path
+    clippings_path: Path
+    book_name: str
+    expected_highlight_count: Optional[int] = None
+    expected_highlight_contents: Optional[Tuple[str, ...]] = None
+
+
+SAMPLE_CASES: Tuple[SampleCase, ...] = (
+    SampleCase(
+        name="Peirce - The Fixation of Belief",
+        pdf_path=SAMPLES_DIR / "peirce-charles-fixation-belief.pdf",
+        sdr_path=SAMPLES_DIR / "peirce-charles-fixation-belief.sdr",
+        clippings_path=SAMPLES_DIR / "peirce-charles-fixation-belief-clippings.txt",
+        book_name="peirce-charles-fixation-belief",
+    ),
+    SampleCase(
+        name="Theatre Hunger Paper",
+        pdf_path=SAMPLES_DIR / "Downey_2024_Theatre_Hunger_Scaling_Up_Paper.pdf",
+        sdr_path=SAMPLES_DIR / "Downey_2024_Theatre_Hunger_Scaling_Up_Paper.sdr",
+        clippings_path=SAMPLES_DIR / "Downey_2024_Theatre_Hunger_Scaling_Up_Paper-clippings.txt",
+        book_name="Downey_2024_Theatre_Hunger_Scaling_Up_Paper",
+    ),
+    SampleCase(
+        name="659ec7697e419",
+        pdf_path=SAMPLES_DIR / "659ec7697e419.pdf-cdeKey_B7PXKZMQKCJFWMWAKW7CUBENBUE7XPLQ.pdf",
+        sdr_path=SAMPLES_DIR / "659ec7697e419.pdf-cdeKey_B7PXKZMQKCJFWMWAKW7CUBENBUE7XPLQ.sdr",
+        clippings_path=SAMPLES_DIR / "659ec7697e419-clippings.txt",
+        book_name="659ec7697e419",
+    ),
+    SampleCase(
+        name="Shea Page 136 (CropBox Example)",
+        pdf_path=SAMPLES_DIR / "page_136_shea.pdf",
+        sdr_path=SAMPLES_DIR / "page_136_shea.sdr",
+        clippings_path=SAMPLES_DIR / "page_136_shea-clippings.txt",
+        book_name="page_136_shea",
+    ),
+    SampleCase(
+        name="Page 2 Paper (Greedy Matching Bug Test)",
+        pdf_path=SAMPLES_DIR / "page_2_paper.pdf",
+        sdr_path=SAMPLES_DIR / "page_2_paper.sdr",
+        clippings_path=SAMPLES_DIR / "page_2_paper-clippings.txt",
+        book_name="page_2_paper",
+        expected_highlight_count=2,  # Should be exactly 2, not dozens
+        expected_highlight_contents=("the", "a"),  # Must match actual highlighted text
+    ),
+)
+
+
+@lru_cache(maxsize=None)
+def first_krds_file(sdr_path: Path) -> Optional[Path]:
+    """
+    Return the first .pds file in an SDR folder (.pdt files contain no annotations), or None.
+
+    Cached so the folder is scanned once per session, however many tests ask for it.
+    """
+    if not sdr_path.is_dir():
+        return None
+    return next(iter(sdr_path.glob("*.pds")), None)
+
+
+def _annotation_cache_key(krds_file_path, clippings_file_path, book_name) -> tuple:
+    krds = str(krds_file_path)
+    clippings = str(clippings_file_path) if clippings_file_path is not None else None
+    return krds, clippings, book_name, os.path.getmtime(krds)
+
+
+def cached_amazon_annotations(krds_file_path, clippings_file_path: Optional[str], book_name: str) -> List[Dict[str, Any]]:
+    """
+    create_amazon_compliant_annotations, computed once per session for each set of arguments.
+
+    The KRDS file's mtime is part of the key so regenerated sample data is picked up. Each call
+    returns a new list, but the annotation dicts are shared between callers and must not be modified.
+    """
+    return list(_cached_annotations(*_annotation_cache_key(krds_file_path, clippings_file_path, book_name)))
+
+
+def cached_annotation_index(krds_file_path, clippings_file_path: Optional[str],
+                            book_name: str) -> Dict[Tuple[Any, Any], List[Dict[str, Any]]]:
+    """
+    The cached annotations indexed by (type, pdf_page_0based), built once per session.
+
+    Look entries up with .get(key, []); the index is shared and must not be modified.
+    """
+    return _cached_index(*_annotation_cache_key(krds_file_path, clippings_file_path, book_name))
+
+
+@lru_cache(maxsize=None)
+def _cached_annotations(krds: str, clippings: Optional[str], book_name: str, mtime: float) -> tuple:
+    return tuple(create_amazon_compliant_annotations(krds, clippings, book_name))
+
+
+@lru_cache(maxsize=None)
+def _cached_index(krds: str, clippings: Optional[str], book_name: str, mtime: float) -> dict:
+    index = defaultdict(list)
+    for annotation in _cached_annotations(krds, clippings, book_name, mtime):
+        index[(annotation.get('type'), annotation.get('pdf_page_0based'))].append(annotation)
+    return dict(index)
+
+
+def annotations_by_type(annotations) -> Dict[Any, List[Dict[str, Any]]]:
+    """Group annotations by their 'type' in one pass; missing types map to an empty list."""
+    groups = defaultdict(list)
+    for annotation in annotations:
+        groups[annotation.get('type')].append(annotation)
+    return groups
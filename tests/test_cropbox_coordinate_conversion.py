@@ -5,24 +5,31 @@ Tests the validated H1 formula with CropBox offset correction.
 """
 
 import unittest
-import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import fitz
-from kindle_parser.amazon_coordinate_system import convert_kindle_to_pdf_coordinates
+from kindle_parser.amazon_coordinate_system import (
+    convert_kindle_to_pdf_coordinates,
+    convert_kindle_to_pdf_coordinates_bulk,
+)
 
 
 class TestCropBoxCoordinateConversion(unittest.TestCase):
     """Test coordinate conversion with CropBox handling"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Build the page rects shared by the tests once (conversion only reads them)"""
+        cls.LETTER_PAGE = fitz.Rect(0, 0, 612, 792)
+        cls.LETTER_CROPBOX = fitz.Rect(0, 0, 612, 792)
+        cls.SHEA_CROPBOX = fitz.Rect(40.1, 0, 612, 792)  # Real Shea PDF CropBox offset (40.1 pts)
+        cls.OFFSET_CROPBOX = fitz.Rect(40.1, 10.0, 612, 792)
+        cls.CORNER_CROPBOX = fitz.Rect(40.1, 20.0, 612, 792)
+    
     def test_no_cropbox_offset(self):
         """Test conversion without CropBox offset (normal PDF)"""
         krds_x, krds_y = 100, 200
-        pdf_rect = fitz.Rect(0, 0, 612, 792)
-        cropbox = fitz.Rect(0, 0, 612, 792)
+        pdf_rect = self.LETTER_PAGE
+        cropbox = self.LETTER_CROPBOX
         
         pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
             krds_x, krds_y,
@@ -40,10 +47,9 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
     def test_with_cropbox_offset(self):
         """Test conversion with CropBox offset (cropped PDF)"""
         krds_x, krds_y = 500, 300
-        cropbox_offset_x, cropbox_offset_y = 40.1, 10.0
-        
-        pdf_rect = fitz.Rect(cropbox_offset_x, cropbox_offset_y, 612, 792)
-        cropbox = fitz.Rect(cropbox_offset_x, cropbox_offset_y, 612, 792)
+        cropbox = self.OFFSET_CROPBOX
+        pdf_rect = cropbox
+        cropbox_offset_x, cropbox_offset_y = cropbox.x0, cropbox.y0
         
         pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
             krds_x, krds_y,
@@ -62,9 +68,8 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
         """Test with real Shea PDF CropBox offset (40.1 pts)"""
         # Use realistic KRDS values that would be within page bounds
         krds_x, krds_y = 500, 300  # Realistic values
-        cropbox_offset = 40.1
-        
-        cropbox = fitz.Rect(cropbox_offset, 0, 612, 792)
+        cropbox = self.SHEA_CROPBOX
+        cropbox_offset = cropbox.x0
         
         pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
             krds_x, krds_y,
@@ -86,7 +91,7 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
         """Test that coordinates are clamped to visible page bounds"""
         # Large KRDS values that would exceed page bounds
         krds_x, krds_y = 10000, 12000
-        cropbox = fitz.Rect(40.1, 0, 612, 792)
+        cropbox = self.SHEA_CROPBOX
         
         pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
             krds_x, krds_y,
@@ -103,23 +108,21 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
         self.assertGreaterEqual(pdf_y, 0)
     
     def test_multiple_coordinates_with_cropbox(self):
-        """Test multiple coordinate pairs with CropBox offset"""
-        cropbox = fitz.Rect(40.1, 0, 612, 792)
-        
-        test_cases = [
-            (100, 100, 31.9, 72.0),   # Small values - within bounds
-            (400, 500, 247.9, 360.0),  # Mid-range - within bounds
-            (700, 800, 463.9, 576.0),  # Higher - within bounds
-        ]
-        
-        for krds_x, krds_y, expected_x, expected_y in test_cases:
-            with self.subTest(krds_x=krds_x, krds_y=krds_y):
-                pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
-                    krds_x, krds_y,
-                    cropbox=cropbox
-                )
-                self.assertAlmostEqual(pdf_x, expected_x, places=1)
-                self.assertAlmostEqual(pdf_y, expected_y, places=1)
+        """Test multiple coordinate pairs with CropBox offset in one bulk conversion"""
+        cropbox = self.SHEA_CROPBOX
+        
+        krds_xs = [100, 400, 700]  # Small, mid-range and higher values - all within bounds
+        krds_ys = [100, 500, 800]
+        
+        pdf_xs, pdf_ys = convert_kindle_to_pdf_coordinates_bulk(krds_xs, krds_ys, cropbox=cropbox)
+        
+        self.assertEqual([round(x, 1) for x in pdf_xs], [31.9, 247.9, 463.9])
+        self.assertEqual([round(y, 1) for y in pdf_ys], [72.0, 360.0, 576.0])
+        # The bulk path must agree exactly with point-by-point conversion
+        self.assertEqual(
+            list(zip(pdf_xs, pdf_ys)),
+            [convert_kindle_to_pdf_coordinates(x, y, cropbox=cropbox) for x, y in zip(krds_xs, krds_ys)]
+        )
     
     def test_none_cropbox(self):
         """Test that None CropBox is handled gracefully"""
@@ -140,7 +143,7 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
     def test_zero_coordinates(self):
         """Test conversion of zero coordinates"""
         krds_x, krds_y = 0, 0
-        cropbox = fitz.Rect(40.1, 20.0, 612, 792)
+        cropbox = self.CORNER_CROPBOX
         
         pdf_x, pdf_y = convert_kindle_to_pdf_coordinates(
             krds_x, krds_y,
@@ -150,7 +153,3 @@ class TestCropBoxCoordinateConversion(unittest.TestCase):
         # Should be 0 - cropbox_offset, but clamped to 0
         self.assertEqual(pdf_x, 0.0)
         self.assertEqual(pdf_y, 0.0)
-
-
-if __name__ == '__main__':
-    unittest.main()
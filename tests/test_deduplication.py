@@ -6,11 +6,6 @@ to ensure the list-based approach correctly handles duplicates.
 """
 
 import unittest
-import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from kindle_parser.amazon_coordinate_system import _deduplicate_annotations
 
@@ -416,7 +411,3 @@ class TestDeduplicationIntegration(unittest.TestCase):
         
         # Should deduplicate to one (all round to 72.0, 144.0)
         self.assertEqual(len(result), 1)
-
-
-if __name__ == '__main__':
-    unittest.main()
@@ -0,0 +1,254 @@
+"""
+Unit tests for the file helpers in utils/file_utils.py
+"""
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+import chardet
+import pytest
+
+from src.utils import file_utils
+from src.utils.file_utils import (
+    copy_file_with_progress,
+    detect_file_encoding,
+    find_kindle_files,
+    find_kindle_files_batch,
+    safe_read_text_file,
+)
+
+KINDLE_ENTRIES = [
+    "Book Name.pds",
+    "Book_Name.pdt",
+    "prefix Book Name suffix.pds",
+    "book name.pds",        # differs only in case
+    "Book Name.PDS",        # upper-case extension
+    ".Book Name.pds",       # dotfile
+    "Book Name.sdr/",       # sidecar folder
+    "Book-Name.pdt",
+    "Other.pds",
+    "Other.sdr/",
+    "Book Name.pdf",        # not a Kindle sidecar file
+    "Book Name.pds.bak",
+]
+
+PDF_NAMES = ["Book Name", "Book_Name", "Book-Name", "book name", "Other", "Missing"]
+
+
+def _reference_find_kindle_files(kindle_path: Path, pdf_name: str):
+    """The original glob-based lookup of find_kindle_files, as sets of paths"""
+    clean_name = pdf_name.replace(' ', '_').replace('-', '_')
+    patterns = [f"*{pdf_name}*", f"*{clean_name}*", f"*{pdf_name.replace('_', ' ')}*",
+                f"*{pdf_name.replace(' ', '_')}*"]
+    return {
+        file_type: {path for pattern in patterns for path in kindle_path.glob(f"{pattern}.{file_type}")}
+        for file_type in ("pds", "pdt", "sdr")
+    }
+
+
+def _as_sets(found):
+    return {file_type: set(paths) for file_type, paths in found.items()}
+
+
+@pytest.fixture
+def kindle_folders(tmp_path):
+    """Two Kindle document folders: one with KINDLE_ENTRIES, one with a single other book"""
+    first = tmp_path / "documents"
+    first.mkdir()
+    for entry in KINDLE_ENTRIES:
+        if entry.endswith("/"):
+            (first / entry).mkdir()
+        else:
+            (first / entry).write_bytes(b"")
+    second = tmp_path / "more_documents"
+    second.mkdir()
+    (second / "Book Name.pdt").write_bytes(b"")
+    (second / "Unrelated.pds").write_bytes(b"")
+    return [first, second]
+
+
+def test_find_kindle_files_batch_matches_single_lookups(kindle_folders):
+    for folder in kindle_folders:
+        batch = find_kindle_files_batch(str(folder), PDF_NAMES)
+
+        assert list(batch) == PDF_NAMES
+        for pdf_name in PDF_NAMES:
+            found = _as_sets(batch[pdf_name])
+            assert found == _as_sets(find_kindle_files(str(folder), pdf_name))
+            assert found == _reference_find_kindle_files(folder, pdf_name)
+
+
+def test_find_kindle_files_matches_dotfiles_and_folders(kindle_folders):
+    folder = kindle_folders[0]
+    found = _as_sets(find_kindle_files(str(folder), "Book Name"))
+
+    assert folder / ".Book Name.pds" in found["pds"]
+    assert found["sdr"] == {folder / "Book Name.sdr"}
+    assert found["pdt"] == {folder / "Book_Name.pdt"}
+    assert folder / "Book Name.pds.bak" not in found["pds"]
+
+
+def test_find_kindle_files_batch_missing_folder(tmp_path):
+    empty = {"pds": [], "pdt": [], "sdr": []}
+    missing = tmp_path / "no_such_folder"
+
+    assert find_kindle_files_batch(str(missing), ["Book Name", "Other"]) == {"Book Name": empty, "Other": empty}
+    assert find_kindle_files(str(missing), "Book Name") == empty
+    assert find_kindle_files_batch(str(missing), []) == {}
+
+
+POLISH_TEXT = "Zażółć gęślą jaźń\n" * 50
+
+
+@pytest.fixture
+def detection_calls(monkeypatch):
+    """Count the encoding detections that actually run (cache misses)"""
+    calls = []
+    detect = file_utils._detect_bytes_encoding
+
+    def counting_detect(raw_data, file_path):
+        calls.append(file_path)
+        return detect(raw_data, file_path)
+
+    monkeypatch.setattr(file_utils, "_detect_bytes_encoding", counting_detect)
+    monkeypatch.setattr(file_utils, "_encoding_cache", {})
+    return calls
+
+
+def _rewrite(path, data):
+    """Replace the file contents and move its mtime forward, as a later save would"""
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+
+
+def test_encoding_detection_is_cached_for_unchanged_file(tmp_path, detection_calls):
+    path = tmp_path / "clippings.txt"
+    path.write_bytes(POLISH_TEXT.encode("utf-8"))
+
+    assert detect_file_encoding(str(path)) == "utf-8"
+    assert detect_file_encoding(str(path)) == "utf-8"
+    assert safe_read_text_file(str(path)) == POLISH_TEXT
+    assert len(detection_calls) == 1
+
+
+def test_encoding_is_detected_again_after_rewrite(tmp_path, detection_calls):
+    path = tmp_path / "clippings.txt"
+    path.write_bytes(POLISH_TEXT.encode("utf-8"))
+    assert detect_file_encoding(str(path)) == "utf-8"
+
+    _rewrite(path, POLISH_TEXT.encode("utf-16"))
+    assert detect_file_encoding(str(path)).lower() == "utf-16"
+    assert safe_read_text_file(str(path)) == POLISH_TEXT
+    assert len(detection_calls) == 2
+
+    # Same size, different contents: the newer mtime alone must invalidate the cached result
+    _rewrite(path, POLISH_TEXT.encode("utf-16").replace("ż".encode("utf-16-le"), "z".encode("utf-16-le")))
+    detect_file_encoding(str(path))
+    assert len(detection_calls) == 3
+
+
+def _load_file_utils(monkeypatch, **modules):
+    """Load a fresh copy of file_utils with the given entries patched into sys.modules"""
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    spec = importlib.util.spec_from_file_location("file_utils_detector_check", file_utils.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _fake_detector(name, result):
+    module = types.ModuleType(name)
+    module.detect = lambda raw_data: result
+    return module
+
+
+def test_installed_charset_normalizer_does_not_replace_chardet(monkeypatch, tmp_path):
+    module = _load_file_utils(monkeypatch, cchardet=None, charset_normalizer=_fake_detector(
+        "charset_normalizer", {"encoding": "cp1250", "confidence": 1.0}))
+    path = tmp_path / "clippings.txt"
+    path.write_bytes(POLISH_TEXT.encode("utf-8"))
+
+    assert module._detect_encoding is chardet.detect
+    assert module._ENCODING_SAMPLE_SIZE == 10000
+    assert module.detect_file_encoding(str(path)) == "utf-8"
+
+
+def test_cchardet_is_used_when_installed(monkeypatch, tmp_path):
+    cchardet = _fake_detector("cchardet", {"encoding": "UTF-16", "confidence": 0.99})
+    module = _load_file_utils(monkeypatch, cchardet=cchardet)
+    path = tmp_path / "clippings.txt"
+    path.write_bytes(POLISH_TEXT.encode("utf-16"))
+
+    assert module._detect_encoding is cchardet.detect
+    assert module.detect_file_encoding(str(path)) == "UTF-16"
+    assert module.safe_read_text_file(str(path)) == POLISH_TEXT
+
+
+def test_detector_without_confidence_falls_back_to_utf8(monkeypatch, tmp_path):
+    module = _load_file_utils(monkeypatch, cchardet=_fake_detector("cchardet", {"encoding": None, "confidence": None}))
+    path = tmp_path / "clippings.txt"
+    path.write_bytes(POLISH_TEXT.encode("utf-8"))
+
+    assert module.detect_file_encoding(str(path)) == "utf-8"
+
+
+COPY_DATA = bytes(range(256)) * 800  # 204800 bytes, not a multiple of the chunk size below
+
+
+@pytest.fixture
+def copyfile_calls(monkeypatch):
+    """Record the calls to shutil.copyfile made by file_utils"""
+    calls = []
+    copyfile = file_utils.shutil.copyfile
+
+    def recording_copyfile(src, dst):
+        calls.append((src, dst))
+        return copyfile(src, dst)
+
+    monkeypatch.setattr(file_utils.shutil, "copyfile", recording_copyfile)
+    return calls
+
+
+def test_copy_without_progress_uses_copyfile(tmp_path, copyfile_calls):
+    src = tmp_path / "source.pdf"
+    src.write_bytes(COPY_DATA)
+    dst = tmp_path / "nested" / "dir" / "copy.pdf"
+
+    assert copy_file_with_progress(str(src), str(dst))
+    assert dst.read_bytes() == COPY_DATA
+    assert copyfile_calls == [(src, dst)]
+
+
+def test_copy_with_progress_reports_every_chunk(tmp_path, copyfile_calls):
+    src = tmp_path / "source.pdf"
+    src.write_bytes(COPY_DATA)
+    dst = tmp_path / "nested" / "copy.pdf"
+    progress = []
+
+    assert copy_file_with_progress(str(src), str(dst), chunk_size=65536,
+                                   progress_callback=lambda copied, total: progress.append((copied, total)))
+    assert dst.read_bytes() == COPY_DATA
+    assert progress == [(65536, 204800), (131072, 204800), (196608, 204800), (204800, 204800)]
+    assert copyfile_calls == []
+
+
+def test_copy_with_progress_of_empty_file(tmp_path):
+    src = tmp_path / "empty.pdf"
+    src.write_bytes(b"")
+    dst = tmp_path / "copy.pdf"
+    progress = []
+
+    assert copy_file_with_progress(str(src), str(dst), progress_callback=lambda *args: progress.append(args))
+    assert dst.read_bytes() == b""
+    assert progress == []
+
+
+def test_copy_missing_source_fails(tmp_path):
+    dst = tmp_path / "copy.pdf"
+    assert not copy_file_with_progress(str(tmp_path / "missing.pdf"), str(dst))
+    assert not copy_file_with_progress(str(tmp_path / "missing.pdf"), str(dst), progress_callback=print)
+    assert not dst.exists()
@@ -4,40 +4,29 @@ Test to verify that highlights are placed at the correct positions in the output
 This test checks that the highlight rectangles match the text locations we found.
 """
 
-import sys
+import logging
 import fitz
-from pathlib import Path
+import pytest
 
-# Add src directory to Python path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+logger = logging.getLogger(__name__)
 
-from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
-from src.pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
-from src.pdf_processor.pdf_annotator import annotate_pdf_file
 
-
-def test_highlight_positions():
+def test_highlight_positions(annotated_peirce_pdf):
     """
     Test that highlights are placed at correct positions by:
     1. Finding where text should be in source PDF
-    2. Creating annotated PDF
+    2. Taking the annotated PDF (built once per session by the annotated_peirce_pdf fixture)
     3. Verifying highlights are at the same positions
     """
     
     # Use peirce example
-    krds_file = 'examples/sample_data/peirce-charles-fixation-belief.sdr/peirce-charles-fixation-belief12347ea8efc3f766707171e2bfcc00f4.pds'
-    clippings_file = 'examples/sample_data/peirce-charles-fixation-belief-clippings.txt'
     source_pdf = 'examples/sample_data/peirce-charles-fixation-belief.pdf'
-    output_pdf = 'tests/output/position_test.pdf'
+    output_pdf = str(annotated_peirce_pdf)
     
-    print("🎯 HIGHLIGHT POSITION TEST")
-    print("=" * 70)
+    # Problems found along the way; Rects are only formatted into messages on failure
+    errors = []
     
     # Step 1: Find where text should be in source PDF
-    print("\n1️⃣ Finding expected text positions in source PDF...")
-    source_doc = fitz.open(source_pdf)
-    
     expected_positions = []
     test_texts = [
         ('The Fixation of Belief', 1),  # Page 1 (0-indexed: 0)
@@ -45,118 +34,103 @@ def test_highlight_positions():
         ('The object of reasoning is to', 2),  # Page 2
     ]
     
-    for text, page_num in test_texts:
-        page = source_doc[page_num - 1]  # Convert to 0-indexed
-        quads = page.search_for(text, quads=True)
+    # page number -> (page, TextPage), so each page's text is extracted only once. The flags are
+    # the ones search_for uses when it builds its own TextPage.
+    search_flags = (fitz.TEXT_DEHYPHENATE | fitz.TEXT_PRESERVE_WHITESPACE |
+                    fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_MEDIABOX_CLIP)
+    text_pages = {}
+    with fitz.open(source_pdf) as source_doc:
+        for text, page_num in test_texts:
+            if page_num not in text_pages:
+                page = source_doc[page_num - 1]  # Convert to 0-indexed
+                text_pages[page_num] = (page, page.get_textpage(flags=search_flags))
+            page, textpage = text_pages[page_num]
+            quads = page.search_for(text, quads=True, textpage=textpage)
         
-        if quads:
-            # Get bounding rectangle
-            text_rect = quads[0].rect if hasattr(quads[0], 'rect') else fitz.Rect(quads[0])
-            for quad in quads[1:]:
-                r = quad.rect if hasattr(quad, 'rect') else fitz.Rect(quad)
-                text_rect = text_rect | r  # Union
+            if quads:
+                # Get bounding rectangle of all the quads in one reduction
+                rects = [quad.rect for quad in quads]
+                text_rect = fitz.Rect(min(r.x0 for r in rects), min(r.y0 for r in rects),
+                                      max(r.x1 for r in rects), max(r.y1 for r in rects))
             
-            expected_positions.append({
-                'text': text,
-                'page': page_num - 1,  # Store as 0-indexed
-                'rect': text_rect
-            })
-            print(f"   ✓ Page {page_num}: '{text[:30]}...' at {text_rect}")
-        else:
-            print(f"   ✗ Page {page_num}: '{text[:30]}...' NOT FOUND!")
-    
-    source_doc.close()
+                expected_positions.append({
+                    'text': text,
+                    'page': page_num - 1,  # Store as 0-indexed
+                    'rect': text_rect
+                })
+            else:
+                logger.warning("Page %d: '%s...' not found in the source PDF", page_num, text[:30])
     
-    # Step 2: Create annotated PDF
-    print("\n2️⃣ Creating annotated PDF...")
-    amazon_annotations = create_amazon_compliant_annotations(krds_file, clippings_file, 'peirce-charles-fixation-belief')
-    pdf_annotator_annotations = convert_amazon_to_pdf_annotator_format(amazon_annotations)
-    annotate_pdf_file(source_pdf, pdf_annotator_annotations, output_path=output_pdf)
-    print(f"   ✓ Created: {output_pdf}")
+    # Step 2: The annotated PDF comes from the fixture
     
     # Step 3: Check highlight positions in output PDF
-    print("\n3️⃣ Verifying highlight positions in output PDF...")
-    output_doc = fitz.open(output_pdf)
-    
-    all_correct = True
     total_checked = 0
     
-    for expected in expected_positions:
-        page = output_doc[expected['page']]
-        annotations = page.annots()
+    with fitz.open(output_pdf) as output_doc:
+        # page index -> (page rect, highlight rects), read once per page rather than once per expected text
+        page_highlights = {}
+        for expected in expected_positions:
+            page_index = expected['page']
+            if page_index not in page_highlights:
+                page = output_doc[page_index]
+                page_highlights[page_index] = (
+                    page.rect,
+                    [annot.rect for annot in page.annots() if annot.type[0] == 8],  # Highlight annotations
+                )
+            page_rect, highlight_rects = page_highlights[page_index]
         
-        if not annotations:
-            print(f"   ✗ Page {expected['page'] + 1}: NO ANNOTATIONS FOUND!")
-            all_correct = False
-            continue
+            if not highlight_rects:
+                errors.append(f"Page {page_index + 1}: no highlights found")
+                continue
         
-        # Find highlight that matches this text
-        found_match = False
-        for annot in annotations:
-            if annot.type[0] == 8:  # Highlight annotation
-                highlight_rect = annot.rect
-                expected_rect = expected['rect']
-                
-                # Calculate overlap
-                overlap_rect = highlight_rect & expected_rect
-                if not overlap_rect.is_empty:
-                    overlap_area = overlap_rect.get_area()
-                    expected_area = expected_rect.get_area()
+            # Find highlight that matches this text
+            found_match = False
+            expected_rect = expected['rect']
+            ex0, ey0, ex1, ey1 = expected_rect
+            expected_area = (ex1 - ex0) * (ey1 - ey0)
+            for highlight_rect in highlight_rects:
+                # Calculate overlap directly from the coordinates instead of building an intersection Rect
+                overlap_width = min(highlight_rect.x1, ex1) - max(highlight_rect.x0, ex0)
+                overlap_height = min(highlight_rect.y1, ey1) - max(highlight_rect.y0, ey0)
+                if overlap_width > 0 and overlap_height > 0:
+                    overlap_area = overlap_width * overlap_height
                     overlap_ratio = overlap_area / expected_area if expected_area > 0 else 0
-                    
+                
                     # Check if highlight is within page bounds
-                    page_rect = page.rect
                     is_within_page = (
                         highlight_rect.x0 >= page_rect.x0 and
                         highlight_rect.x1 <= page_rect.x1 and
                         highlight_rect.y0 >= page_rect.y0 and
                         highlight_rect.y1 <= page_rect.y1
                     )
-                    
+                
                     if overlap_ratio >= 0.8:
                         found_match = True
                         total_checked += 1
-                        
+                    
                         if is_within_page:
-                            print(f"   ✓ Page {expected['page'] + 1}: '{expected['text'][:30]}...'")
-                            print(f"      Expected: {expected_rect}")
-                            print(f"      Actual:   {highlight_rect}")
-                            print(f"      Overlap:  {overlap_ratio:.1%}")
+                            logger.debug("Page %d: '%s...' expected %s, actual %s, overlap %.1f%%",
+                                         page_index + 1, expected['text'][:30],
+                                         expected_rect, highlight_rect, overlap_ratio * 100)
                         else:
-                            print(f"   ⚠️  Page {expected['page'] + 1}: '{expected['text'][:30]}...' - OUTSIDE PAGE BOUNDS!")
-                            print(f"      Page bounds: {page_rect}")
-                            print(f"      Expected:    {expected_rect}")
-                            print(f"      Actual:      {highlight_rect}")
-                            print(f"      Overlap:     {overlap_ratio:.1%}")
-                            all_correct = False
+                            errors.append(
+                                f"Page {page_index + 1}: '{expected['text'][:30]}...' is outside the page bounds "
+                                f"{page_rect} (expected {expected_rect}, actual {highlight_rect}, "
+                                f"overlap {overlap_ratio:.1%})")
                         break
         
-        if not found_match:
-            print(f"   ✗ Page {expected['page'] + 1}: '{expected['text'][:30]}...' - NO MATCHING HIGHLIGHT!")
-            print(f"      Expected at: {expected['rect']}")
-            print("      Available highlights on page:")
-            for annot in annotations:
-                if annot.type[0] == 8:
-                    print(f"         - {annot.rect}")
-            all_correct = False
-    
-    output_doc.close()
+            if not found_match:
+                errors.append(
+                    f"Page {page_index + 1}: no highlight matches '{expected['text'][:30]}...' "
+                    f"expected at {expected_rect}; highlights on the page: "
+                    + ", ".join(str(highlight_rect) for highlight_rect in highlight_rects))
     
-    # Summary
-    print("\n" + "=" * 70)
-    if all_correct and total_checked > 0:
-        print(f"✅ SUCCESS: All {total_checked} highlights are correctly positioned!")
-    else:
-        print("❌ FAILURE: Highlights are NOT at expected positions!")
-        print("\n🔍 DEBUGGING INFO:")
-        print("   The highlights were created but may be placed incorrectly.")
-        print("   Possible issues:")
-        print("   - Coordinate system mismatch between annotation creation and PDF rendering")
-        print("   - PDF coordinate origin (top-left vs bottom-left)")
-        print("   - Incorrect rectangle calculation in pdf_annotator.py")
-        raise AssertionError("Highlights are not at expected positions")
+    # A mismatch usually means a coordinate system mismatch between annotation creation and PDF
+    # rendering, the PDF coordinate origin (top-left vs bottom-left), or the rectangle calculation
+    # in pdf_annotator.py
+    assert not errors, "Highlights are not at expected positions:\n" + "\n".join(errors)
+    assert total_checked > 0, "No expected highlight positions were checked"
 
 
 if __name__ == '__main__':
-    success = test_highlight_positions()
-    sys.exit(0 if success else 1)
+    pytest.main([__file__, "-v", "-s"])
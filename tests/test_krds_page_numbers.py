@@ -3,7 +3,7 @@
 Test to verify KRDS parser correctly reads page numbers by comparing
 with MyClippings data for the same highlights.
 
-This test uses the 4 sample PDFs in examples/sample_data/ which have both:
+This test uses the sample PDFs in examples/sample_data/ which have both:
 1. .pds files (KRDS data)
 2. -clippings.txt files (MyClippings data)
 
@@ -14,11 +14,14 @@ import sys
 from pathlib import Path
 import json
 
-# Add src to path
+# This module is a script (python tests/test_krds_page_numbers.py), not a pytest module, so it
+# cannot rely on tests/conftest.py for the project root and src/ on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from kindle_parser.krds_parser import KindleReaderDataStore
 from kindle_parser.clippings_parser import parse_myclippings_for_book
+from tests.sample_cases import SAMPLE_CASES, first_krds_file
 
 
 class PageNumberValidator:
@@ -110,58 +113,22 @@ class PageNumberValidator:
     
     def run_all_tests(self):
         """Run tests on all sample PDFs."""
-        samples_dir = Path('examples/sample_data')
-        
-        # Define test cases
-        test_cases = [
-            {
-                'name': '659ec7697e419',
-                'pdf': samples_dir / '659ec7697e419.pdf-cdeKey_B7PXKZMQKCJFWMWAKW7CUBENBUE7XPLQ.pdf',
-                'pds': samples_dir / '659ec7697e419.pdf-cdeKey_B7PXKZMQKCJFWMWAKW7CUBENBUE7XPLQ.sdr',
-                'clippings': samples_dir / '659ec7697e419-clippings.txt'
-            },
-            {
-                'name': 'Downey_2024',
-                'pdf': samples_dir / 'Downey_2024_Theatre_Hunger_Scaling_Up_Paper.pdf',
-                'pds': samples_dir / 'Downey_2024_Theatre_Hunger_Scaling_Up_Paper.sdr',
-                'clippings': samples_dir / 'Downey_2024_Theatre_Hunger_Scaling_Up_Paper-clippings.txt'
-            },
-            {
-                'name': 'page_136_shea',
-                'pdf': samples_dir / 'page_136_shea.pdf',
-                'pds': samples_dir / 'page_136_shea.sdr',
-                'clippings': samples_dir / 'page_136_shea-clippings.txt'
-            },
-            {
-                'name': 'peirce-charles',
-                'pdf': samples_dir / 'peirce-charles-fixation-belief.pdf',
-                'pds': samples_dir / 'peirce-charles-fixation-belief.sdr',
-                'clippings': samples_dir / 'peirce-charles-fixation-belief-clippings.txt'
-            }
-        ]
-        
-        for test_case in test_cases:
+        for case in SAMPLE_CASES:
             # Find .pds file in .sdr directory
-            if test_case['pds'].is_dir():
-                pds_files = list(test_case['pds'].glob('*.pds'))
-                if pds_files:
-                    pds_path = pds_files[0]
-                else:
-                    print(f"\n❌ No .pds file found for {test_case['name']}")
-                    continue
-            else:
-                print(f"\n❌ .sdr directory not found for {test_case['name']}")
+            pds_path = first_krds_file(case.sdr_path)
+            if pds_path is None:
+                print(f"\n❌ No .pds file found for {case.book_name}")
                 continue
             
-            if not test_case['clippings'].exists():
-                print(f"\n❌ Clippings file not found for {test_case['name']}")
+            if not case.clippings_path.exists():
+                print(f"\n❌ Clippings file not found for {case.book_name}")
                 continue
             
             self.test_sample(
-                test_case['name'],
-                test_case['pdf'],
+                case.book_name,
+                case.pdf_path,
                 pds_path,
-                test_case['clippings']
+                case.clippings_path
             )
         
         # Print summary
@@ -0,0 +1,119 @@
+"""
+Unit tests for Kindle location decoding and location-to-page mapping in utils/location_encoder.py
+"""
+import pytest
+
+from src.utils.location_encoder import (
+    DecodedLocation,
+    KindleLocationEncoder,
+    PageLocationMapper,
+    _parse_location,
+)
+
+LOCATIONS = ["150", "1500", "2999", "99999", "", None, "x", "10-20", "Location 1500", " 1500 ", 1500, 0,
+             "150", "10-20", "abc-def", "-5", "12-34-56"]
+
+
+def _reference_location_to_pdf_page(mapper, location):
+    """The original per-location mapping, built on the decode_location dictionary"""
+    decoded = mapper.encoder.decode_location(location)
+    if "error" in decoded:
+        return 0, 0.0
+    loc_num = decoded["start_location"] if decoded["type"] == "range" else decoded["location"]
+    pdf_page = int(loc_num / mapper.estimated_total_locations * mapper.pdf_page_count)
+    pdf_page = max(0, min(pdf_page, mapper.pdf_page_count - 1))
+    return pdf_page, 0.7 if mapper.estimated_total_locations else 0.3
+
+
+@pytest.mark.parametrize("page_count, total_locations", [(300, 3000), (12, None), (1, 50)])
+def test_batch_mapping_matches_single_lookups(page_count, total_locations):
+    mapper = PageLocationMapper(page_count, total_locations)
+    expected = [_reference_location_to_pdf_page(mapper, location) for location in LOCATIONS]
+
+    assert mapper.kindle_locations_to_pdf_pages(LOCATIONS) == expected
+    assert [mapper.kindle_location_to_pdf_page(location) for location in LOCATIONS] == expected
+    # A second pass is answered from the memo and gives the same results
+    assert mapper.kindle_locations_to_pdf_pages(iter(LOCATIONS)) == expected
+    assert mapper.kindle_locations_to_pdf_pages([]) == []
+
+
+def test_mapping_follows_changed_page_count_and_total():
+    mapper = PageLocationMapper(300, 3000)
+    assert mapper.kindle_locations_to_pdf_pages(["1500", "2999"]) == [(150, 0.7), (299, 0.7)]
+
+    mapper.estimated_total_locations = 6000
+    assert mapper.kindle_locations_to_pdf_pages(["1500", "2999"]) == [(75, 0.7), (149, 0.7)]
+
+    mapper.pdf_page_count = 100
+    assert mapper.kindle_location_to_pdf_page("1500") == (25, 0.7)
+    assert mapper.kindle_locations_to_pdf_pages(LOCATIONS) == [
+        _reference_location_to_pdf_page(mapper, location) for location in LOCATIONS]
+
+
+# decode_location results recorded from the implementation before DecodedLocation was introduced
+DECODED = [
+    ("", {"error": "Empty location string"}),
+    (None, {"error": "Empty location string"}),
+    ("567", {"type": "single", "location": 567, "estimated_words": 150, "estimated_page": 56}),
+    ("  1234 \n", {"type": "single", "location": 1234, "estimated_words": 150, "estimated_page": 123}),
+    (1500, {"type": "single", "location": 1500, "estimated_words": 150, "estimated_page": 150}),
+    ("0", {"type": "single", "location": 0, "estimated_words": 150, "estimated_page": 1}),
+    ("+7", {"type": "single", "location": 7, "estimated_words": 150, "estimated_page": 1}),
+    ("١٢", {"type": "single", "location": 12, "estimated_words": 150, "estimated_page": 1}),
+    ("1234-1235", {"type": "range", "start_location": 1234, "end_location": 1235, "span": 2,
+                   "estimated_words": 300, "estimated_page": 123}),
+    ("1235-1234", {"type": "range", "start_location": 1235, "end_location": 1234, "span": 0,
+                   "estimated_words": 0, "estimated_page": 123}),
+    ("12-34-56", {"type": "extracted", "location": 12, "original": "12-34-56", "estimated_page": 1}),
+    ("Location 1500", {"type": "extracted", "location": 1500, "original": "Location 1500", "estimated_page": 150}),
+    ("abc-def", {"error": "Invalid range format: abc-def"}),
+    ("-5", {"error": "Invalid range format: -5"}),
+    ("invalid", {"error": "Cannot parse location: invalid"}),
+]
+
+
+@pytest.mark.parametrize("location, expected", DECODED, ids=[repr(location) for location, _ in DECODED])
+def test_decode_location_returns_original_dicts(location, expected):
+    assert KindleLocationEncoder().decode_location(location) == expected
+
+
+@pytest.mark.parametrize("location, expected", [
+    ("567", DecodedLocation("single", 567, 567)),
+    (" 1234-1235 ", DecodedLocation("range", 1234, 1235)),
+    ("Location 1500", DecodedLocation("extracted", 1500, 1500)),
+    (1500, DecodedLocation("single", 1500, 1500)),
+    ("", DecodedLocation("error", error="Empty location string")),
+    (None, DecodedLocation("error", error="Empty location string")),
+    ("abc-def", DecodedLocation("error", error="Invalid range format: abc-def")),
+    ("invalid", DecodedLocation("error", error="Cannot parse location: invalid")),
+])
+def test_parse_location(location, expected):
+    assert KindleLocationEncoder().parse_location(location) == expected
+
+
+@pytest.mark.parametrize("location", [location for location, _ in DECODED])
+def test_parse_location_agrees_with_decode_location(location):
+    encoder = KindleLocationEncoder()
+    parsed = encoder.parse_location(location)
+    decoded = encoder.decode_location(location)
+
+    if "error" in decoded:
+        assert (parsed.type, parsed.error) == ("error", decoded["error"])
+    elif decoded["type"] == "range":
+        assert parsed == ("range", decoded["start_location"], decoded["end_location"], "")
+    else:
+        assert parsed == (decoded["type"], decoded["location"], decoded["location"], "")
+
+
+def test_normalize_location_format():
+    encoder = KindleLocationEncoder()
+    assert encoder.normalize_location_format(" 1234-1235 ") == "1234-1235"
+    assert encoder.normalize_location_format("Location 1500") == "1500"
+    assert encoder.normalize_location_format("invalid") == "invalid"
+
+
+def test_parse_cache_is_bounded():
+    for i in range(_parse_location.cache_info().maxsize + 10):
+        _parse_location(f"Location {i}")
+    info = _parse_location.cache_info()
+    assert info.maxsize is not None and info.currsize <= info.maxsize
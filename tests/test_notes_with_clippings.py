@@ -11,7 +11,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
+from tests.sample_cases import annotations_by_type, cached_amazon_annotations
 
 
 def test_notes_with_clippings_file():
@@ -32,7 +32,7 @@ def test_notes_with_clippings_file():
     book_name = 'peirce-charles-fixation-belief'
     
     # Create annotations WITH clippings file
-    annotations = create_amazon_compliant_annotations(
+    annotations = cached_amazon_annotations(
         krds_file,
         clippings_file,
         book_name
@@ -42,9 +42,8 @@ def test_notes_with_clippings_file():
     print(f"   Total annotations: {len(annotations)}")
     
     # Separate by type
-    highlights = [ann for ann in annotations if ann.get('type') == 'highlight']
-    notes = [ann for ann in annotations if ann.get('type') == 'note']
-    bookmarks = [ann for ann in annotations if ann.get('type') == 'bookmark']
+    by_type = annotations_by_type(annotations)
+    highlights, notes, bookmarks = by_type['highlight'], by_type['note'], by_type['bookmark']
     
     print(f"   Highlights: {len(highlights)}")
     print(f"   Notes: {len(notes)}")
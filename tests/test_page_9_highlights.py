@@ -76,6 +76,7 @@ def test_page_9_highlights():
     pdf_file = 'examples/sample_data/page_9_test.pdf'
     output_file = 'tests/output/page_9_annotated.pdf'
     book_name = 'rorot-thesis-20250807'
+    Path(output_file).parent.mkdir(exist_ok=True)
     
     print(f"   Input PDF: {pdf_file}")
     print(f"   Output PDF: {output_file}")
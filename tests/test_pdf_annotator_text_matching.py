@@ -0,0 +1,463 @@
+"""
+Unit tests for the text matching helpers of PDFAnnotator: matching annotation content
+against the page's characters and words, and the normalization tables behind them.
+"""
+import importlib.util
+import random
+import re
+import sys
+from collections import defaultdict
+
+import fitz
+import pytest
+
+from src.pdf_processor import column_aware_highlighting, pdf_annotator
+from src.pdf_processor.pdf_annotator import (
+    _HYPHEN_DELETE,
+    _NON_ALNUM_RE,
+    _TOKEN_NORM_TABLE,
+    PDFAnnotator,
+    _normalize_page_text,
+)
+
+TOL = 0.5
+
+PAGE_LINES = [
+    "between the informational models and content-specific computations of special-",
+    "purpose systems, at one end, and the general-purpose compositionality and",
+    "content-general reasoning of deliberate thought, at the other.",
+]
+
+
+@pytest.fixture
+def annotator(tmp_path):
+    """PDFAnnotator opened on a one-page PDF containing PAGE_LINES"""
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=300)
+    for i, line in enumerate(PAGE_LINES):
+        page.insert_text((20, 80 + 16 * i), line, fontsize=9)
+    pdf_path = tmp_path / "text_matching.pdf"
+    doc.save(pdf_path)
+    doc.close()
+
+    annotator = PDFAnnotator(str(pdf_path))
+    assert annotator.open_pdf()
+    yield annotator
+    annotator.close_pdf()
+
+
+def _assert_rect_close(actual, expected):
+    assert all(abs(a - e) <= TOL for a, e in zip(actual, expected)), f"{actual} != {expected}"
+
+
+def test_char_quads_cover_single_line_match(annotator):
+    page = annotator.doc[0]
+    quads = annotator._build_quads_via_chars(page, "informational models")
+
+    assert quads is not None and len(quads) == 1
+    _assert_rect_close(quads[0], page.search_for("informational models")[0])
+
+
+def test_char_quads_follow_snake_pattern_across_hyphenated_line_break(annotator):
+    page = annotator.doc[0]
+    quads = annotator._build_quads_via_chars(page, "special-purpose systems")
+
+    assert quads is not None and len(quads) == 2
+    first, last = quads
+    special = page.search_for("special")[0]
+    systems = page.search_for("systems")[0]
+    # First line starts at the first matched char and runs to the block's right edge
+    assert abs(first[0] - special.x0) <= TOL
+    assert first[2] >= special.x1
+    # Last line starts at the block's left edge and stops at the last matched char
+    assert abs(last[0] - 20) <= TOL
+    assert abs(last[2] - systems.x1) <= TOL
+    assert first[1] < last[1]
+
+
+def test_char_quads_reject_missing_and_too_short_content(annotator):
+    page = annotator.doc[0]
+    assert annotator._build_quads_via_chars(page, "not on this page") is None
+    assert annotator._build_quads_via_chars(page, "a") is None
+    assert annotator._build_quads_via_chars(page, "") is None
+
+
+def _rawdict_chars(page):
+    """The page's chars as (x0, y0, x1, y1, ch, block, line, span) tuples in reading order"""
+    return [
+        (*char["bbox"], char["c"], block["number"], line_no, span_no)
+        for block in page.get_text("rawdict")["blocks"]
+        for line_no, line in enumerate(block.get("lines", []))
+        for span_no, span in enumerate(line["spans"])
+        for char in span["chars"]
+    ]
+
+
+def _reference_build_quads_via_chars(page, content):
+    """The original per-char _build_quads_via_chars, fed the same flattened rawdict chars"""
+    if not content:
+        return None
+    chars = _rawdict_chars(page)
+    if not chars:
+        return None
+
+    norm_page_chars = []
+    norm_map = []
+    prev_was_space = False
+    skip_next_space = False
+    for idx, (_x0, _y0, _x1, _y1, ch, _b, _ln, _sp) in enumerate(chars):
+        c = ch.lower()
+        if c == '-':
+            skip_next_space = True
+            continue
+        if (not c.isalnum()) or c.isspace():
+            if skip_next_space:
+                skip_next_space = False
+                continue
+            if not prev_was_space and norm_page_chars:
+                norm_page_chars.append(' ')
+                norm_map.append(idx)
+            prev_was_space = True
+            continue
+        prev_was_space = False
+        skip_next_space = False
+        norm_page_chars.append(c)
+        norm_map.append(idx)
+
+    norm_page = ''.join(norm_page_chars).strip()
+    if not norm_page:
+        return None
+
+    content_norm = content.lower().replace('-', '')
+    content_norm = re.sub(r"[^a-z0-9]+", " ", content_norm)
+    content_norm = re.sub(r"\s+", " ", content_norm).strip()
+    if len(content_norm) < 2:
+        return None
+
+    start = norm_page.find(content_norm)
+    if start < 0:
+        return None
+    end = start + len(content_norm)
+    if start >= len(norm_map) or end > len(norm_map):
+        return None
+    match_char_indices = norm_map[start:end]
+
+    by_line = defaultdict(list)
+    for orig_idx in match_char_indices:
+        by_line[chars[orig_idx][5:7]].append(orig_idx)
+
+    first = chars[match_char_indices[0]]
+    block_rect = None
+    for blk in page.get_text("blocks"):
+        r = fitz.Rect(blk[:4])
+        if r.contains(fitz.Rect(first[:4])):
+            block_rect = r
+            break
+
+    ordered_keys = sorted(by_line.keys(), key=lambda k: k[1])
+    total_lines = len(ordered_keys)
+    quads = []
+    for i, key in enumerate(ordered_keys):
+        orig_indices = by_line[key]
+        xs0 = min(chars[j][0] for j in orig_indices)
+        ys0 = min(chars[j][1] for j in orig_indices)
+        xs1 = max(chars[j][2] for j in orig_indices)
+        ys1 = max(chars[j][3] for j in orig_indices)
+        line_x0, line_x1 = (block_rect.x0, block_rect.x1) if block_rect is not None else (xs0, xs1)
+        if total_lines == 1:
+            x0, x1 = xs0, xs1
+        elif i == 0:
+            x0, x1 = xs0, line_x1
+        elif i == total_lines - 1:
+            x0, x1 = line_x0, xs1
+        else:
+            x0, x1 = line_x0, line_x1
+        quads.append((x0, ys0, x1, ys1))
+    return quads
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_char_quads_match_reference(seed, annotator):
+    page = annotator.doc[0]
+    page_text = "".join(char[4] for char in _rawdict_chars(page))
+    rng = random.Random(seed)
+    for _ in range(100):
+        # Any slice of the page's chars, so matches start and end mid-word and cross lines
+        start = rng.randrange(len(page_text))
+        content = page_text[start:start + rng.randint(1, 120)]
+        if rng.random() < 0.2:
+            content = content.replace(rng.choice(content), rng.choice(["x", " ", "-", "."]))
+
+        expected = _reference_build_quads_via_chars(page, content)
+        actual = annotator._build_quads_via_chars(page, content)
+        if expected is None:
+            assert actual is None, content
+        else:
+            assert actual is not None and len(actual) == len(expected), content
+            for quad, ref in zip(actual, expected):
+                _assert_rect_close(quad, ref)
+
+
+def _reference_find_word_indices(words, content):
+    """The original nested-loop _find_word_indices, kept to check the optimized one against"""
+    if not content or not words:
+        return []
+
+    def norm_token(s):
+        return re.sub(r"[^a-z0-9]", "", s.lower())
+
+    content_words = content.lower().split()[:5]
+    if not content_words:
+        return []
+
+    for start_idx in range(len(words)):
+        match_indices = []
+        word_idx = start_idx
+        content_idx = 0
+
+        while content_idx < len(content_words) and word_idx < len(words):
+            word_text = words[word_idx][4] if len(words[word_idx]) > 4 else ""
+            norm_word = norm_token(word_text)
+            norm_content = norm_token(content_words[content_idx])
+
+            if norm_word and norm_content:
+                if norm_word == norm_content or norm_word in norm_content or norm_content in norm_word:
+                    match_indices.append(word_idx)
+                    content_idx += 1
+                elif len(match_indices) == 0:
+                    pass
+                else:
+                    break
+
+            word_idx += 1
+
+        if len(match_indices) >= min(3, len(content_words)):
+            estimated_end = min(len(words), match_indices[-1] + len(content.split()) + 5)
+            return list(range(match_indices[0], estimated_end))
+
+    return []
+
+
+# Words chosen to exercise partial matches ("the"/"then"/"other"), case, punctuation,
+# hyphenation, non-ASCII letters and tokens that normalize to nothing
+_WORD_VOCAB = ["the", "The", "then", "other", "a", "an", "and", "plug-and-play", "con-", "cept",
+               "thought.", "(1877)", "—", "...", "naïve", "Ünïcode", "ﬁx", "fix", "x2", "2"]
+
+
+def _random_words(rng, count):
+    words = []
+    for i in range(count):
+        text = rng.choice(_WORD_VOCAB)
+        if rng.random() < 0.05:
+            words.append((0.0, 0.0, 1.0, 1.0))  # malformed entry without text
+        else:
+            words.append((float(i), 0.0, float(i) + 1, 1.0, text, 0, i // 8, i % 8))
+    return words
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_word_indices_matches_reference(seed, annotator):
+    rng = random.Random(seed)
+    for _ in range(200):
+        words = _random_words(rng, rng.randint(0, 40))
+        if words and rng.random() < 0.7:
+            # Content taken from the page, sometimes with one word swapped out
+            start = rng.randrange(len(words))
+            picked = [w[4] for w in words[start:start + rng.randint(1, 8)] if len(w) > 4]
+            if picked and rng.random() < 0.3:
+                picked[rng.randrange(len(picked))] = rng.choice(_WORD_VOCAB)
+            content = " ".join(picked)
+        else:
+            content = " ".join(rng.choice(_WORD_VOCAB) for _ in range(rng.randint(0, 6)))
+
+        assert annotator._find_word_indices(words, content) == _reference_find_word_indices(words, content), (
+            words, content)
+
+
+def _reference_rects_per_line(words, indices):
+    """The original _rects_per_line, grouping word indices per line before taking each line's union"""
+    if not indices or not words:
+        return None
+
+    line_groups = defaultdict(list)
+    for word_idx in indices:
+        if 0 <= word_idx < len(words):
+            word = words[word_idx]
+            line_groups[(word[5], word[6])].append(word_idx)
+    if not line_groups:
+        return None
+
+    sorted_lines = sorted(line_groups.keys(), key=lambda k: (k[0], k[1]))
+    total_lines = len(sorted_lines)
+    block_words = [w for w in words if w[5] == words[indices[0]][5]]
+    block_left = min(w[0] for w in block_words)
+    block_right = max(w[2] for w in block_words)
+
+    quads = []
+    for line_idx, line_key in enumerate(sorted_lines):
+        line_words = [words[idx] for idx in line_groups[line_key]]
+        word_left = min(w[0] for w in line_words)
+        word_right = max(w[2] for w in line_words)
+        word_top = min(w[1] for w in line_words)
+        word_bottom = max(w[3] for w in line_words)
+        if total_lines == 1:
+            rect_left, rect_right = word_left, word_right
+        elif line_idx == 0:
+            rect_left, rect_right = word_left, block_right
+        elif line_idx == total_lines - 1:
+            rect_left, rect_right = block_left, word_right
+        else:
+            rect_left, rect_right = block_left, block_right
+        quads.append((rect_left, word_top, rect_right, word_bottom))
+    return quads or None
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rects_per_line_matches_reference(seed, annotator):
+    rng = random.Random(seed)
+    for _ in range(200):
+        words = []
+        for i in range(rng.randint(1, 40)):
+            x0 = rng.uniform(0, 500)
+            y0 = rng.uniform(0, 700)
+            words.append((x0, y0, x0 + rng.uniform(1, 80), y0 + rng.uniform(5, 15), "w",
+                          rng.randint(0, 3), rng.randint(0, 5), i))
+        n_words = len(words)
+        # The first index must be a real word; later ones may be out of range, repeated or unordered
+        indices = [rng.randrange(n_words)] + [rng.randint(-2, n_words + 2) for _ in range(rng.randint(0, 15))]
+
+        assert annotator._rects_per_line(words, indices) == _reference_rects_per_line(words, indices)
+
+
+def test_rects_per_line_snake_pattern(annotator):
+    words = [
+        (100, 10, 140, 20, "first", 0, 0, 0), (150, 10, 300, 20, "line", 0, 0, 1),
+        (20, 30, 280, 40, "middle", 0, 1, 0),
+        (20, 50, 90, 60, "last", 0, 2, 0), (95, 50, 200, 60, "line", 0, 2, 1),
+    ]
+
+    assert annotator._rects_per_line(words, [0, 1, 2, 3]) == [
+        (100, 10, 300, 20),
+        (20, 30, 300, 40),
+        (20, 50, 90, 60),
+    ]
+    assert annotator._rects_per_line(words, [7, 9]) is None
+    assert annotator._rects_per_line([], [0]) is None
+
+
+def _reference_normalize_page_text(text):
+    """The per-char normalization loop of _page_char_index, as (normalized text, index map)"""
+    parts = []
+    norm_map = []
+    prev_was_space = False
+    skip_next_space = False
+    for idx, ch in enumerate(text):
+        c = ch.lower()
+        if c == '-':
+            skip_next_space = True
+            continue
+        if (not c.isalnum()) or c.isspace():
+            if skip_next_space:
+                skip_next_space = False
+                continue
+            if not prev_was_space and parts:
+                parts.append(' ')
+                norm_map.append(idx)
+            prev_was_space = True
+            continue
+        prev_was_space = False
+        skip_next_space = False
+        parts.append(c)
+        norm_map.append(idx)
+    return ''.join(parts), norm_map
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "special-\npurpose systems",
+    "plug-and-play device",
+    "a - b -- c---  d",
+    "- leading and trailing -",
+    "x-\n\ny",
+    "The ﬁrst ﬂow, ﬀ and ﬃ ligatures",
+    "Ünïcode naïve café ΣΑΣ Straße",
+    "digits 42, ١٢٣, ² and ½",
+    "\t tabs\u00a0and\u2003spaces \r\n  newlines\n",
+    "(1877), p. 3—4. “Quoted” ‐ dash",
+])
+def test_normalize_page_text_matches_per_char_loop(text):
+    normalized, norm_map = _normalize_page_text(text)
+    assert (normalized, list(norm_map)) == _reference_normalize_page_text(text)
+
+
+def test_normalize_page_text_gives_up_when_lowercasing_changes_length():
+    # "İ".lower() is two characters, so the index map could not line up with the chars
+    assert _normalize_page_text("İstanbul") is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_normalize_page_text_matches_per_char_loop_on_random_text(seed):
+    rng = random.Random(seed)
+    alphabet = "aZ9 -\n\t.,;ﬁéΣß١²\u00a0\u2003—"
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        normalized, norm_map = _normalize_page_text(text)
+        assert (normalized, list(norm_map)) == _reference_normalize_page_text(text), repr(text)
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("Thought.", "thought"),
+    ("plug-and-play", "plugandplay"),
+    ("con-", "con"),
+    ("(1877),", "1877"),
+    ("x2", "x2"),
+    ("naïve", "nave"),
+    ("ÜBER", "ber"),
+    ("ﬁx", "x"),
+    ("İ", "i"),  # lower-cases to "i" plus a combining dot, which is dropped
+    ("—", ""),
+    ("...", ""),
+    ("", ""),
+])
+def test_token_norm_table(token, expected):
+    assert token.translate(_TOKEN_NORM_TABLE) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_token_norm_table_matches_regex(seed):
+    rng = random.Random(seed)
+    alphabet = "aZ9-.,'()ïÜﬁİΣ١ \t—"
+    for _ in range(500):
+        token = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert token.translate(_TOKEN_NORM_TABLE) == re.sub(r"[^a-z0-9]", "", token.lower()), repr(token)
+
+
+@pytest.mark.parametrize("content", [
+    "special-purpose, systems!",
+    "  The Fixation of Belief  ",
+    "plug-and-play -- device",
+    "naïve café (1877); p. 3—4",
+    "\ttabs\nand newlines ",
+    "---",
+])
+def test_char_match_content_normalization(content):
+    # The content normalization of _build_quads_via_chars against its original four steps
+    reference = content.lower().replace('-', '')
+    reference = re.sub(r"[^a-z0-9]+", " ", reference)
+    reference = re.sub(r"\s+", " ", reference).strip()
+
+    assert _NON_ALNUM_RE.sub(" ", content.lower().translate(_HYPHEN_DELETE)).strip() == reference
+
+
+def test_pdf_annotator_imports_without_coordinate_converter(monkeypatch):
+    # Load a fresh copy of the module outside its package, with the absolute fallback blocked,
+    # so that neither import of convert_kindle_to_pdf_coordinates can succeed
+    monkeypatch.setitem(sys.modules, "column_aware_highlighting", column_aware_highlighting)
+    monkeypatch.setitem(sys.modules, "kindle_parser.amazon_coordinate_system", None)
+    spec = importlib.util.spec_from_file_location("pdf_annotator_without_converter", pdf_annotator.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module.convert_kindle_to_pdf_coordinates is None
+    assert module._parse_kindle_position("135 0 1414 1 424 338 10 14") is None
+    assert pdf_annotator._parse_kindle_position("135 0 1414 1 424 338 10 14") is not None
@@ -0,0 +1,67 @@
+"""
+Unit tests for writing Kindle bookmarks into the PDF outline
+"""
+import logging
+
+import fitz
+import pytest
+
+from src.pdf_processor.pdf_annotator import PDFAnnotator
+
+
+@pytest.fixture
+def annotator(tmp_path):
+    """PDFAnnotator opened on a three-page PDF whose outline already has one entry"""
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page().insert_text((72, 72), f"Page {i + 1} text", fontsize=11)
+    doc.set_toc([[1, "Existing entry", 1]])
+    pdf_path = tmp_path / "bookmarks.pdf"
+    doc.save(pdf_path)
+    doc.close()
+
+    annotator = PDFAnnotator(str(pdf_path))
+    assert annotator.open_pdf()
+    yield annotator
+    annotator.close_pdf()
+
+
+def _bookmark(page_number, minute):
+    return {"type": "bookmark", "page_number": page_number, "timestamp": f"2024-01-01T10:{minute:02d}:00"}
+
+
+def _highlight(page_number):
+    return {"type": "highlight", "page_number": page_number, "content": "text",
+            "pdf_x": 72, "pdf_y": 60, "pdf_width": 60, "pdf_height": 14}
+
+
+def test_bookmarks_keep_input_order_in_outline(annotator):
+    annotations = [_bookmark(2, 1), _highlight(0), _bookmark(0, 2), _highlight(2), _bookmark(1, 3), _bookmark(2, 4)]
+
+    assert annotator.add_annotations(annotations) == 6
+    assert annotator.doc.get_toc() == [
+        [1, "Existing entry", 1],
+        [1, "Kindle Bookmark (2024-01-01 10:01)", 3],
+        [1, "Kindle Bookmark (2024-01-01 10:02)", 1],
+        [1, "Kindle Bookmark (2024-01-01 10:03)", 2],
+        [1, "Kindle Bookmark (2024-01-01 10:04)", 3],
+    ]
+
+
+def test_bookmarks_are_logged_once_written(annotator, caplog):
+    with caplog.at_level(logging.INFO, logger="src.pdf_processor.pdf_annotator"):
+        assert annotator.add_annotations([_bookmark(1, 5)]) == 1
+
+    assert "Added PDF bookmark 'Kindle Bookmark (2024-01-01 10:05)' for page 2" in caplog.messages
+
+
+def test_failed_outline_write_is_not_logged_as_added(annotator, caplog, monkeypatch):
+    def fail_set_toc(toc):
+        raise RuntimeError("outline is read-only")
+
+    monkeypatch.setattr(annotator.doc, "set_toc", fail_set_toc)
+    with caplog.at_level(logging.INFO, logger="src.pdf_processor.pdf_annotator"):
+        assert annotator.add_annotations([_bookmark(0, 6), _highlight(0)]) == 1
+
+    assert not any(message.startswith("Added PDF bookmark") for message in caplog.messages)
+    assert any("Error writing 1 PDF bookmarks" in message for message in caplog.messages)
@@ -12,7 +12,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
+from tests.sample_cases import cached_amazon_annotations
 from src.pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
 from src.pdf_processor.pdf_annotator import annotate_pdf_file
 from src.kindle_parser.clippings_parser import parse_myclippings_for_book
@@ -80,7 +80,7 @@ def test_peirce_highlight_text_coverage():
         print(f"   Found {len(expected_highlights)} highlights with text content")
 
         print("\n2. 🔧 Creating annotated PDF...")
-        amazon_annotations = create_amazon_compliant_annotations(krds_file, clippings_file, book_name)
+        amazon_annotations = cached_amazon_annotations(krds_file, clippings_file, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(amazon_annotations)
         result_path = annotate_pdf_file(pdf_file, pdf_annotations, output_file)
         print(f"   Created annotated PDF: {result_path}")
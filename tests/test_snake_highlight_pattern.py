@@ -14,7 +14,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
+from tests.sample_cases import cached_amazon_annotations
 from src.pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
 from src.pdf_processor.pdf_annotator import annotate_pdf_file
 
@@ -61,7 +61,7 @@ class TestSnakeHighlightPattern:
         After the period normalization fix, the "object of reasoning" highlight now spans 6 lines.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
@@ -123,7 +123,7 @@ class TestSnakeHighlightPattern:
         Test that 2-line highlights have 2 quads.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
@@ -156,7 +156,7 @@ class TestSnakeHighlightPattern:
         Test that single-line highlights have 1 quad.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
@@ -193,7 +193,7 @@ class TestSnakeHighlightPattern:
         Unified notes (highlights with attached notes) should have content and "Kindle Note" title.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
@@ -238,7 +238,7 @@ class TestSnakeHighlightPattern:
         to add_highlight_annot() instead of converting to Rects.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
@@ -279,7 +279,7 @@ class TestSnakeHighlightPattern:
         Test that snake pattern has proper alignment with varying widths.
         """
         # Parse and create annotations
-        annotations = create_amazon_compliant_annotations(peirce_krds_path, peirce_clippings_path, book_name)
+        annotations = cached_amazon_annotations(peirce_krds_path, peirce_clippings_path, book_name)
         pdf_annotations = convert_amazon_to_pdf_annotator_format(annotations)
         
         # Create annotated PDF
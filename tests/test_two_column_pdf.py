@@ -4,16 +4,12 @@ Comprehensive end-to-end test for two-column PDF with highlights, notes, and boo
 Tests the Peirce "Fixation of Belief" PDF with actual Kindle annotation data.
 """
 
-import sys
 import os
 from pathlib import Path
 import pytest
 
-# Add src to path for imports
-sys.path.append(str(Path(__file__).parent.parent / "src"))
-
 from pdf_processor.pdf_annotator import PDFAnnotator
-from kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
+from tests.sample_cases import annotations_by_type, cached_amazon_annotations
 
 
 class TestTwoColumnPDF:
@@ -37,7 +33,7 @@ class TestTwoColumnPDF:
     
     def test_parse_annotations_from_krds(self):
         """Test parsing annotations from KRDS files"""
-        annotations = create_amazon_compliant_annotations(
+        annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -46,9 +42,8 @@ class TestTwoColumnPDF:
         assert len(annotations) > 0, "Should find annotations in KRDS file"
         
         # Separate by type
-        highlights = [ann for ann in annotations if ann.get('type') == 'highlight']
-        notes = [ann for ann in annotations if ann.get('type') == 'note']
-        bookmarks = [ann for ann in annotations if ann.get('type') == 'bookmark']
+        by_type = annotations_by_type(annotations)
+        highlights, notes, bookmarks = by_type['highlight'], by_type['note'], by_type['bookmark']
         
         print(f"\n📊 ANNOTATION SUMMARY:")
         print(f"   Total annotations: {len(annotations)}")
@@ -64,7 +59,7 @@ class TestTwoColumnPDF:
     def test_highlight_page_distribution(self):
         """Test that highlights are distributed across expected pages"""
         # Parse annotations locally
-        annotations = create_amazon_compliant_annotations(
+        annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -97,7 +92,7 @@ class TestTwoColumnPDF:
     def test_note_page_distribution(self):
         """Test that notes are on expected pages"""
         # Parse annotations locally
-        annotations = create_amazon_compliant_annotations(
+        annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -169,7 +164,7 @@ class TestTwoColumnPDF:
     def test_create_annotated_pdf(self):
         """Test creating annotated PDF with two-column awareness"""
         # Parse annotations locally
-        amazon_annotations = create_amazon_compliant_annotations(
+        amazon_annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -206,7 +201,7 @@ class TestTwoColumnPDF:
     def test_verify_annotations_in_output(self):
         """Verify annotations were properly added to output PDF"""
         # Create annotated PDF locally
-        amazon_annotations = create_amazon_compliant_annotations(
+        amazon_annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -279,7 +274,7 @@ class TestTwoColumnPDF:
             pytest.skip("MyClippings.txt file not found")
         
         # Parse annotations from KRDS only (no merging with MyClippings)
-        annotations = create_amazon_compliant_annotations(
+        annotations = cached_amazon_annotations(
             str(self.krds_file),
             None,  # Don't merge with MyClippings - just extract from KRDS
             "peirce-charles-fixation-belief"
@@ -298,9 +293,9 @@ class TestTwoColumnPDF:
         print(f"   MyClippings entries: {len(myclippings_entries)}")
         
         # Validate that we have the expected number of each type
-        krds_highlights = [ann for ann in annotations if ann.get('type') == 'highlight']
-        krds_notes = [ann for ann in annotations if ann.get('type') == 'note']
-        krds_bookmarks = [ann for ann in annotations if ann.get('type') == 'bookmark']
+        krds_by_type = annotations_by_type(annotations)
+        krds_highlights, krds_notes, krds_bookmarks = (
+            krds_by_type['highlight'], krds_by_type['note'], krds_by_type['bookmark'])
         
         myclippings_highlights = [entry for entry in myclippings_entries if entry.get('type') == 'highlight']
         myclippings_notes = [entry for entry in myclippings_entries if entry.get('type') == 'note']
@@ -328,11 +323,10 @@ class TestTwoColumnPDF:
         """Test that bookmarks are properly stored as PDF navigation bookmarks (same as CLI)"""
         
         # Step 1: Create Amazon-compliant annotations (same as CLI)
-        from src.kindle_parser.amazon_coordinate_system import create_amazon_compliant_annotations
         from src.pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
         from src.pdf_processor.pdf_annotator import annotate_pdf_file
         
-        annotations = create_amazon_compliant_annotations(str(self.krds_file), None, "peirce-charles-fixation-belief")
+        annotations = cached_amazon_annotations(str(self.krds_file), None, "peirce-charles-fixation-belief")
         print(f"Amazon annotations: {len(annotations)}")
         
         # Step 2: Convert using the same adapter as CLI
@@ -386,7 +380,7 @@ class TestTwoColumnPDF:
     def test_column_aware_highlighting(self):
         """Test that multi-line highlights respect column boundaries"""
         # Create annotated PDF locally
-        amazon_annotations = create_amazon_compliant_annotations(
+        amazon_annotations = cached_amazon_annotations(
             str(self.krds_file), 
             None,  # No MyClippings.txt for this test
             "peirce-charles-fixation-belief"
@@ -453,29 +447,4 @@ class TestTwoColumnPDF:
                         else:
                             print(f"     ⚠️  High width variance - may span columns")
         
-        doc.close()
-
-
-if __name__ == "__main__":
-    # Run the tests
-    test_instance = TestTwoColumnPDF()
-    test_instance.setup_class()
-    
-    print("🧪 RUNNING COMPREHENSIVE TWO-COLUMN PDF TESTS")
-    print("=" * 60)
-    
-    try:
-        test_instance.test_pdf_and_krds_files_exist()
-        test_instance.test_parse_annotations_from_krds()
-        test_instance.test_highlight_page_distribution()
-        test_instance.test_note_page_distribution()
-        test_instance.test_two_column_layout_detection()
-        test_instance.test_create_annotated_pdf()
-        test_instance.test_verify_annotations_in_output()
-        test_instance.test_column_aware_highlighting()
-        
-        print("\n🎉 ALL TESTS PASSED!")
-        
-    except Exception as e:
-        print(f"\n💥 TEST FAILED: {e}")
-        raise
\ No newline at end of file
+        doc.close()
\ No newline at end of file
@@ -17,15 +17,14 @@ import os
 from pathlib import Path
 
 # Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import fitz
-from kindle_parser.amazon_coordinate_system import (
-    _deduplicate_annotations,
-    create_amazon_compliant_annotations
-)
+from kindle_parser.amazon_coordinate_system import _deduplicate_annotations
 from pdf_processor.amazon_to_pdf_adapter import convert_amazon_to_pdf_annotator_format
 from pdf_processor.pdf_annotator import annotate_pdf_file
+from tests.sample_cases import annotations_by_type, cached_amazon_annotations, cached_annotation_index
 
 
 class TestUnifiedNoteRendering(unittest.TestCase):
@@ -525,7 +524,7 @@ class TestPeirceUnification(unittest.TestCase):
         if not os.path.exists(krds_file) or not os.path.exists(clippings_file):
             self.skipTest("Peirce example files not found")
         
-        annotations = create_amazon_compliant_annotations(
+        annotations = cached_amazon_annotations(
             krds_file, clippings_file, book_name
         )
         
@@ -534,9 +533,8 @@ class TestPeirceUnification(unittest.TestCase):
                         "Peirce should have 10 annotations after unification")
         
         # Count types
-        highlights = [a for a in annotations if a['type'] == 'highlight']
-        notes = [a for a in annotations if a['type'] == 'note']
-        bookmarks = [a for a in annotations if a['type'] == 'bookmark']
+        by_type = annotations_by_type(annotations)
+        highlights, notes, bookmarks = by_type['highlight'], by_type['note'], by_type['bookmark']
         
         self.assertEqual(len(highlights), 6, "Should have 6 regular highlights")
         self.assertEqual(len(notes), 2, "Should have 2 unified notes")
@@ -568,13 +566,10 @@ class TestPeirceUnification(unittest.TestCase):
         if not os.path.exists(krds_file) or not os.path.exists(clippings_file):
             self.skipTest("Peirce example files not found")
         
-        annotations = create_amazon_compliant_annotations(
-            krds_file, clippings_file, book_name
-        )
+        index = cached_annotation_index(krds_file, clippings_file, book_name)
         
         # Find the note on page 3 (0-based) / page 4 (1-based)
-        notes_on_page_3 = [a for a in annotations 
-                          if a['type'] == 'note' and a['pdf_page_0based'] == 3]
+        notes_on_page_3 = index.get(('note', 3), [])
         
         # Should have exactly 1 note on page 3
         self.assertEqual(len(notes_on_page_3), 1,
@@ -597,8 +592,7 @@ class TestPeirceUnification(unittest.TestCase):
                         f"Note should NOT be unified with 'Assassins...' but got: {highlight_content[:50]}")
         
         # Also verify that "The Assassins..." exists as a separate highlight on the same page
-        highlights_on_page_3 = [a for a in annotations 
-                               if a['type'] == 'highlight' and a['pdf_page_0based'] == 3]
+        highlights_on_page_3 = index.get(('highlight', 3), [])
         
         assassins_highlights = [h for h in highlights_on_page_3 
                                if 'Assassins' in h.get('content', '')]